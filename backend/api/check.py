@@ -1,11 +1,18 @@
-from flask import request
+from flask import Response, request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
 from . import api
+from crawler.robots import RobotsPolicy
+from crawler.sitemap import default_sitemap_url, iter_sitemap
+from services.http_client import get_session, iterate_sync, limited, run_sync
+from services.url_check_cache import url_check_cache
 import aiohttp
 import asyncio
+import json
 from urllib.parse import urlparse
-import re
+
+MAX_URLS = 10000
+CHECK_TIMEOUT = aiohttp.ClientTimeout(total=5)
 
 class UrlValidationAPI(Resource):
     @jwt_required()
@@ -20,39 +27,82 @@ class UrlValidationAPI(Resource):
         if not urls:
             return {'error': 'No URLs provided'}, 400
             
-        results = asyncio.run(self._check_urls(urls))
+        if len(urls) > MAX_URLS:
+            return {'error': f'At most {MAX_URLS} URLs per request'}, 400
+            
+        # refresh=true 时忽略缓存重新检查
+        refresh = bool(data.get('refresh'))
+        
+        # 批量模式：按完成顺序逐行返回 NDJSON
+        if data.get('stream'):
+            checks = iterate_sync(self._iter_checks(urls, refresh))
+            lines = (json.dumps(result) + '\n' for result in checks)
+            return Response(lines, mimetype='application/x-ndjson')
+            
+        results = run_sync(self._check_urls(urls, refresh))
         return {'results': results}
         
-    async def _check_urls(self, urls):
-        async def check_single_url(url):
-            # 基本URL格式验证
-            if not self._is_valid_url_format(url):
-                return {
-                    'url': url,
-                    'valid': False,
-                    'error': 'Invalid URL format'
-                }
+    async def _check_urls(self, urls, refresh=False):
+        cached = {} if refresh else await url_check_cache.get_many(urls)
+        return await asyncio.gather(*(
+            self._check_single_url(url, cached) for url in urls
+        ))
+        
+    async def _iter_checks(self, urls, refresh=False):
+        cached = {} if refresh else await url_check_cache.get_many(urls)
+        # 命中缓存的结果先返回
+        for url in urls:
+            if url in cached:
+                yield cached[url]
                 
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.head(url, allow_redirects=True, timeout=5) as response:
-                        return {
-                            'url': url,
-                            'valid': response.status < 400,
-                            'status': response.status,
-                            'content_type': response.headers.get('content-type', ''),
-                            'redirected': response.real_url != url if response.real_url else False
-                        }
-            except aiohttp.ClientError as e:
-                return {
-                    'url': url,
-                    'valid': False,
-                    'error': str(e)
-                }
+        tasks = [
+            asyncio.ensure_future(self._check_single_url(url, cached))
+            for url in urls if url not in cached
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            # 客户端断开时取消剩余检查
+            for task in tasks:
+                task.cancel()
                 
-        tasks = [check_single_url(url) for url in urls]
-        return await asyncio.gather(*tasks)
+    async def _check_single_url(self, url, cached):
+        if url in cached:
+            return cached[url]
+            
+        # 基本URL格式验证
+        if not self._is_valid_url_format(url):
+            return {
+                'url': url,
+                'valid': False,
+                'error': 'Invalid URL format'
+            }
+            
+        return await url_check_cache.check(url, self._head)
         
+    async def _head(self, url):
+        """发起 HEAD 请求，返回 (结果, 异常)"""
+        try:
+            session = await get_session()
+            async with limited():
+                async with session.head(url, allow_redirects=True, timeout=CHECK_TIMEOUT) as response:
+                    final_url = str(response.url)
+                    return {
+                        'url': url,
+                        'valid': response.status < 400,
+                        'status': response.status,
+                        'content_type': response.headers.get('content-type', ''),
+                        'redirected': final_url != url,
+                        'final_url': final_url
+                    }, None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return {
+                'url': url,
+                'valid': False,
+                'error': str(e) or e.__class__.__name__
+            }, e
+            
     def _is_valid_url_format(self, url):
         try:
             result = urlparse(url)
@@ -74,27 +124,29 @@ class RobotsCheckAPI(Resource):
         robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
         
         try:
-            response = asyncio.run(self._fetch_robots(robots_url))
+            response = run_sync(self._fetch_robots(robots_url))
             return response
         except Exception as e:
             return {'error': str(e)}, 500
             
     async def _fetch_robots(self, robots_url):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(robots_url, timeout=5) as response:
+            session = await get_session()
+            async with limited():
+                async with session.get(robots_url, timeout=CHECK_TIMEOUT) as response:
                     if response.status == 200:
                         text = await response.text()
                         return {
                             'exists': True,
                             'content': text,
-                            'rules': self._parse_robots(text)
+                            'rules': self._parse_robots(text),
+                            'agents': RobotsPolicy.parse(text).to_dict()
                         }
                     return {
                         'exists': False,
                         'status': response.status
                     }
-        except aiohttp.ClientError as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             return {
                 'exists': False,
                 'error': str(e)
@@ -105,18 +157,20 @@ class RobotsCheckAPI(Resource):
         current_agent = '*'
         
         for line in content.split('\n'):
-            line = line.strip().lower()
-            if not line or line.startswith('#'):
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
                 continue
                 
-            if line.startswith('user-agent:'):
-                current_agent = line.split(':', 1)[1].strip()
-            elif line.startswith('disallow:') or line.startswith('allow:'):
-                rule_type, path = line.split(':', 1)
+            # 只有指令名不区分大小写，路径保持原样
+            field, value = line.split(':', 1)
+            field = field.strip().lower()
+            if field == 'user-agent':
+                current_agent = value.strip().lower()
+            elif field in ('disallow', 'allow', 'crawl-delay'):
                 rules.append({
                     'agent': current_agent,
-                    'type': rule_type.strip(),
-                    'path': path.strip()
+                    'type': field,
+                    'path': value.strip()
                 })
                 
         return rules
@@ -131,41 +185,40 @@ class SitemapCheckAPI(Resource):
         if not url:
             return {'error': 'URL is required'}, 400
             
-        parsed = urlparse(url)
-        sitemap_url = f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"
+        sitemap_url = data.get('sitemap') or default_sitemap_url(url)
+        try:
+            sample_size = min(int(data.get('limit', 100)), 1000)
+            max_urls = int(data.get('maxUrls', 50000))
+        except (TypeError, ValueError):
+            return {'error': 'limit and maxUrls must be integers'}, 400
         
         try:
-            response = asyncio.run(self._fetch_sitemap(sitemap_url))
+            response = run_sync(self._fetch_sitemap(sitemap_url, sample_size, max_urls))
             return response
         except Exception as e:
             return {'error': str(e)}, 500
             
-    async def _fetch_sitemap(self, sitemap_url):
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(sitemap_url, timeout=5) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        return {
-                            'exists': True,
-                            'content': text,
-                            'urls': self._extract_urls(text)
-                        }
-                    return {
-                        'exists': False,
-                        'status': response.status
-                    }
-        except aiohttp.ClientError as e:
-            return {
-                'exists': False,
-                'error': str(e)
-            }
-            
-    def _extract_urls(self, content):
+    async def _fetch_sitemap(self, sitemap_url, sample_size, max_urls):
+        """流式遍历 sitemap，只返回数量和少量样例，不回传原文"""
+        count = 0
         urls = []
-        url_pattern = re.compile(r'<loc>(.*?)</loc>')
-        matches = url_pattern.findall(content)
-        return matches
+        entries = iter_sitemap(sitemap_url)
+        try:
+            async for entry in entries:
+                count += 1
+                if len(urls) < sample_size:
+                    urls.append({'loc': entry.loc, 'lastmod': entry.lastmod})
+                if count >= max_urls:
+                    break
+        finally:
+            await entries.aclose()
+                    
+        return {
+            'exists': count > 0,
+            'count': count,
+            'truncated': count >= max_urls,
+            'urls': urls
+        }
 
 # 注册API路由
 api.add_resource(UrlValidationAPI, '/check/url')
@@ -1,12 +1,39 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from . import api
-from services.task_queue import celery
-from models import CrawlerTask, db
-from crawler.engine import SmartCrawler
+from app.celery_app import celery
+from config import Config
+from models import CrawlTask, db
+from crawler.login_detection import login_detector
+from crawler.session_store import seal_login
+from services.http_client import run_sync
+from services.task_stats import record_task_created
+from crawler.frontier import normalize_url
+from crawler.sink import WRITERS
+from celery import group
+from redis import RedisError
+from datetime import datetime
+import math
 import uuid
 
+MAX_DEPTH = 5
+MAX_BULK_TASKS = 5000
+# 每条 INSERT 语句的行数和每次发布到 broker 的任务数
+INSERT_CHUNK_SIZE = 1000
+DISPATCH_CHUNK_SIZE = 500
+# 需要是数字的任务设置，并发和速率类设置入库前按 Config 中的上限截断
+NUMERIC_SETTINGS = (
+    ('workers', int),
+    ('concurrency', int),
+    ('hostConcurrency', int),
+    ('maxRequestsPerSecond', float)
+)
+MIN_REQUESTS_PER_SECOND = 0.1
+# 登录检测任务的发起人，保留时间与 Celery 结果默认过期时间（1 天）一致
+LOGIN_JOB_KEY = 'login-job:{}'
+LOGIN_JOB_TTL = 24 * 3600
+
 class CrawlerAPI(Resource):
     @jwt_required()
     def post(self):
@@ -17,27 +44,34 @@ class CrawlerAPI(Resource):
         # 验证输入
         if not data or 'urls' not in data:
             return {'error': 'Missing required fields'}, 400
+        error = _validate_task_spec(data)
+        if error:
+            return {'error': error}, 400
             
         task_id = str(uuid.uuid4())
+        urls = [data['urls']] if isinstance(data['urls'], str) else data['urls']
+        settings = _task_settings(data.get('settings', {}))
         
         # 创建任务记录
-        task = CrawlerTask(
+        task = CrawlTask(
             id=task_id,
-            user_id=user_id,
-            urls=data['urls'],
+            created_by=user_id,
+            urls=urls,
             depth=data.get('depth', 2),
             status='pending',
-            settings=data.get('settings', {})
+            config=settings
         )
         db.session.add(task)
         db.session.commit()
+        record_task_created(current_app.redis, user_id)
         
-        # 启动异步任务
-        celery.send_task(
-            'tasks.crawl_task',
-            args=[task_id, data['urls'], data.get('depth', 2)],
-            kwargs={'settings': data.get('settings', {})}
-        )
+        # 启动异步任务，多 worker 任务共享同一个 Redis 调度队列
+        for _ in range(settings['workers']):
+            celery.send_task(
+                'tasks.crawl_task',
+                args=[task_id, urls, data.get('depth', 2)],
+                kwargs={'settings': settings}
+            )
         
         return {'task_id': task_id}, 201
 
@@ -46,7 +80,7 @@ class CrawlerConfigAPI(Resource):
     def get(self):
         """获取爬虫配置选项"""
         return {
-            'maxDepth': 5,
+            'maxDepth': MAX_DEPTH,
             'supportedFeatures': [
                 'login_detection',
                 'smart_extraction',
@@ -55,8 +89,23 @@ class CrawlerConfigAPI(Resource):
             'defaultSettings': {
                 'useProxy': True,
                 'respectRobots': True,
+                'useSitemap': False,
                 'delay': 1.0,
-                'maxRetries': 3
+                'maxRetries': 3,
+                'concurrency': 4,
+                'hostConcurrency': 4,
+                'workers': 1,
+                'renderMode': 'auto',
+                'waitUntil': 'domcontentloaded',
+                'settleTimeout': 2000,
+                'blockResources': ['image', 'media', 'font'],
+                'blockTrackers': True,
+                'resultSink': 'mysql',
+                'nearDuplicateDistance': 5,
+                'incremental': True,
+                'adaptiveRate': False,
+                'maxRequestsPerSecond': 4.0,
+                'retryDelay': 2.0
             }
         }
 
@@ -70,16 +119,175 @@ class LoginDetectionAPI(Resource):
         if not url:
             return {'error': 'URL is required'}, 400
             
-        crawler = SmartCrawler(None)
-        requires_login = crawler.detect_login_requirement(url)
+        # 缓存或 HTTP 探测能判断的直接返回，否则交给 worker 用浏览器检测
+        try:
+            verdict = run_sync(login_detector.detect(url, allow_browser=False), timeout=10)
+        except (TimeoutError, RedisError):
+            # 探测超时或缓存不可用时同样交给 worker
+            verdict = None
+        if verdict is None:
+            job = celery.send_task('tasks.detect_login', args=[url])
+            # 记录发起人，只允许本人查询检测结果
+            current_app.redis.set(LOGIN_JOB_KEY.format(job.id), get_jwt_identity(), ex=LOGIN_JOB_TTL)
+            return {'url': url, 'status': 'pending', 'jobId': job.id}, 202
+            
+        return _login_response(url, verdict)
+
+class LoginDetectionJobAPI(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """查询浏览器登录检测任务的结果"""
+        owner = current_app.redis.get(LOGIN_JOB_KEY.format(job_id))
+        if owner != str(get_jwt_identity()):
+            return {'error': 'Job not found'}, 404
+            
+        result = celery.AsyncResult(job_id)
+        if result.failed():
+            return {'jobId': job_id, 'status': 'failed', 'error': str(result.result)}, 500
+        if not result.ready():
+            return {'jobId': job_id, 'status': 'pending'}, 202
+            
+        verdict = result.result
+        if not isinstance(verdict, dict) or not {'requiresLogin', 'reason', 'method'} <= verdict.keys():
+            return {'error': 'Job not found'}, 404
+        return _login_response(verdict.get('url'), verdict)
+
+def _login_response(url, verdict):
+    return {
+        'url': url,
+        'status': 'done',
+        'requiresLogin': verdict['requiresLogin'],
+        'loginFormDetected': verdict['reason'] == 'password_form',
+        'reason': verdict['reason'],
+        'method': verdict['method'],
+        'cached': verdict.get('cached', False)
+    }
+
+class CrawlerBulkAPI(Resource):
+    @jwt_required()
+    def post(self):
+        """批量创建爬虫任务
+
+        请求体为 {"tasks": [{"urls": ..., "depth": 2, "settings": {...}}, ...]}。
+        全部任务校验通过后才写入：同一事务内多行 INSERT，提交后分批发布到 Celery。
+        """
+        user_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+        specs = data.get('tasks')
+        
+        if not isinstance(specs, list) or not specs:
+            return {'error': 'tasks must be a non-empty list'}, 400
+        if len(specs) > MAX_BULK_TASKS:
+            return {'error': f'At most {MAX_BULK_TASKS} tasks per request'}, 400
+            
+        errors = []
+        rows = []
+        now = datetime.utcnow()
+        for index, spec in enumerate(specs):
+            error = _validate_task_spec(spec)
+            if error:
+                errors.append({'index': index, 'error': error})
+                continue
+            urls = [spec['urls']] if isinstance(spec['urls'], str) else spec['urls']
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'created_by': user_id,
+                'urls': urls,
+                'depth': spec.get('depth', 2),
+                'status': 'pending',
+                'config': _task_settings(spec.get('settings', {})),
+                'created_at': now
+            })
+            
+        if errors:
+            return {'error': 'Invalid task specs', 'details': errors}, 400
+            
+        table = CrawlTask.__table__
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            db.session.execute(table.insert().values(rows[start:start + INSERT_CHUNK_SIZE]))
+        db.session.commit()
+        record_task_created(current_app.redis, user_id, created_at=now, count=len(rows))
         
-        return {
-            'url': url,
-            'requiresLogin': requires_login,
-            'loginFormDetected': requires_login
-        }
+        # 与单个创建一致，每个 worker 一条消息；按批发布以减少 broker 往返
+        signatures = [
+            celery.signature(
+                'tasks.crawl_task',
+                args=[row['id'], row['urls'], row['depth']],
+                kwargs={'settings': row['config']}
+            )
+            for row in rows
+            for _ in range(row['config']['workers'])
+        ]
+        for start in range(0, len(signatures), DISPATCH_CHUNK_SIZE):
+            group(signatures[start:start + DISPATCH_CHUNK_SIZE]).apply_async()
+        
+        return {'task_ids': [row['id'] for row in rows]}, 201
+
+def _validate_task_spec(spec):
+    """校验单个任务参数，返回错误信息，通过时返回 None"""
+    if not isinstance(spec, dict):
+        return 'Task spec must be an object'
+    urls = spec.get('urls')
+    if isinstance(urls, str):
+        urls = [urls]
+    if not isinstance(urls, list) or not urls:
+        return 'Missing required field: urls'
+    invalid = [url for url in urls if not isinstance(url, str) or normalize_url(url) is None]
+    if invalid:
+        return f'Invalid URL: {invalid[0]}'
+    depth = spec.get('depth', 2)
+    if not isinstance(depth, int) or isinstance(depth, bool) or not 0 <= depth <= MAX_DEPTH:
+        return f'depth must be an integer between 0 and {MAX_DEPTH}'
+    settings = spec.get('settings', {})
+    if not isinstance(settings, dict):
+        return 'settings must be an object'
+    for name, cast in NUMERIC_SETTINGS:
+        if name not in settings:
+            continue
+        value = settings[name]
+        if isinstance(value, bool):
+            return f'settings.{name} must be a number'
+        try:
+            if not math.isfinite(cast(value)):
+                return f'settings.{name} must be a number'
+        except (TypeError, ValueError, OverflowError):
+            return f'settings.{name} must be a number'
+    if settings.get('resultSink', 'mysql') not in WRITERS:
+        return f"settings.resultSink must be one of: {', '.join(WRITERS)}"
+    login = settings.get('login')
+    if login:
+        if not isinstance(login, dict) or not isinstance(login.get('url'), str) \
+                or normalize_url(login['url']) is None:
+            return 'settings.login.url must be a valid URL'
+        if not all(isinstance(login.get(name), str) for name in ('username', 'password')):
+            return 'settings.login requires username and password'
+    return None
+
+def _clamp_settings(settings):
+    """把 workers 和并发、速率设置限制在配置的上限内，每个 worker 对应一条 broker 消息"""
+    workers = int(settings.get('workers', 1))
+    settings = dict(settings, workers=min(max(workers, 1), Config.CRAWL_MAX_WORKERS))
+    limits = {
+        'concurrency': Config.CRAWL_MAX_CONCURRENCY,
+        'hostConcurrency': Config.CRAWL_MAX_HOST_CONCURRENCY,
+        'maxRequestsPerSecond': Config.CRAWL_MAX_REQUESTS_PER_SECOND
+    }
+    for name, cast in NUMERIC_SETTINGS:
+        if name in limits and name in settings:
+            lower = 1 if cast is int else MIN_REQUESTS_PER_SECOND
+            settings[name] = min(max(cast(settings[name]), lower), limits[name])
+    return settings
+
+def _task_settings(settings):
+    """入库和派发前的任务设置：限制数值范围，登录账号密码加密后保存"""
+    settings = _clamp_settings(settings)
+    if settings.get('login'):
+        settings['login'] = seal_login(settings['login'])
+    return settings
 
 # 注册API路由
 api.add_resource(CrawlerAPI, '/crawler')
+api.add_resource(CrawlerBulkAPI, '/crawler/bulk')
 api.add_resource(CrawlerConfigAPI, '/crawler/config')
-api.add_resource(LoginDetectionAPI, '/crawler/check-login')
\ No newline at end of file
+api.add_resource(LoginDetectionAPI, '/crawler/check-login')
+api.add_resource(LoginDetectionJobAPI, '/crawler/check-login/<job_id>')
\ No newline at end of file
@@ -1,100 +1,144 @@
-from flask import request
+from flask import request, current_app
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from . import api
-from models import CrawlerTask, db
-from datetime import datetime, timedelta
+from models import CrawlTask, db
+from app.celery_app import celery
+from services.task_control import set_task_control
+from services.task_stats import get_task_stats, record_status_change
+from services.task_cursor import encode_cursor, decode_cursor
 
 class TaskAPI(Resource):
     @jwt_required()
     def get(self, task_id):
         """获取单个任务详情"""
-        task = CrawlerTask.query.get_or_404(task_id)
+        task = CrawlTask.query.get_or_404(task_id)
+        
+        if task.created_by != get_jwt_identity():
+            return {'error': 'Unauthorized'}, 403
+            
         return task.to_dict()
 
 class TaskListAPI(Resource):
+    MAX_PER_PAGE = 100
+    COUNT_TTL = 60
+
     @jwt_required()
     def get(self):
-        """获取任务列表"""
+        """获取任务列表
+
+        按 (created_at, id) 游标分页，翻到任意深度耗时不变；总数取缓存的近似值。
+        """
         user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), self.MAX_PER_PAGE)
         status = request.args.get('status')
+        cursor = request.args.get('cursor')
         
-        query = CrawlerTask.query.filter_by(user_id=user_id)
+        # created_by、status、created_at、id 依次命中 crawl_tasks 的复合索引
+        query = CrawlTask.query.filter(CrawlTask.created_by == user_id)
         
         if status:
-            query = query.filter_by(status=status)
+            query = query.filter(CrawlTask.status == status)
+            
+        if cursor:
+            try:
+                created_at, task_id = decode_cursor(cursor)
+            except ValueError:
+                return {'error': 'Invalid cursor'}, 400
+            query = query.filter(db.or_(
+                CrawlTask.created_at < created_at,
+                db.and_(CrawlTask.created_at == created_at, CrawlTask.id < task_id)
+            ))
+        else:
+            # 兼容旧的页码参数，深翻页仍应使用游标
+            page = request.args.get('page', 1, type=int)
+            if page > 1:
+                query = query.offset((page - 1) * per_page)
             
-        tasks = query.order_by(CrawlerTask.created_at.desc())\
-                    .paginate(page=page, per_page=per_page)
+        # 多取一条判断是否还有下一页
+        tasks = query.order_by(CrawlTask.created_at.desc(), CrawlTask.id.desc())\
+                    .limit(per_page + 1).all()
+        has_more = len(tasks) > per_page
+        tasks = tasks[:per_page]
         
         return {
-            'items': [task.to_dict() for task in tasks.items],
-            'total': tasks.total,
-            'pages': tasks.pages,
-            'current_page': tasks.page
+            'items': [task.to_dict() for task in tasks],
+            'total': self._count(user_id, status),
+            'next_cursor': encode_cursor(tasks[-1]) if has_more else None,
+            'has_more': has_more
         }
 
+    def _count(self, user_id, status):
+        """任务总数，在 Redis 中缓存一小段时间，避免每次翻页都 COUNT(*)"""
+        key = f"tasks:count:{user_id}:{status or 'all'}"
+        total = current_app.redis.get(key)
+        if total is not None:
+            return int(total)
+        
+        query = db.session.query(db.func.count(CrawlTask.id))\
+                    .filter(CrawlTask.created_by == user_id)
+        if status:
+            query = query.filter(CrawlTask.status == status)
+        total = query.scalar()
+        current_app.redis.set(key, total, ex=self.COUNT_TTL)
+        return total
+
 class TaskStatsAPI(Resource):
     @jwt_required()
     def get(self):
-        """获取任务统计信息"""
+        """获取任务统计信息
+
+        读取 Redis 中增量维护的汇总，不再扫描用户的全部任务；
+        历史数据由 tasks.backfill_task_stats 回填。
+        """
         user_id = get_jwt_identity()
-        now = datetime.utcnow()
-        last_week = now - timedelta(days=7)
-        
-        # 总任务统计
-        total_stats = db.session.query(
-            CrawlerTask.status,
-            db.func.count(CrawlerTask.id)
-        ).filter(
-            CrawlerTask.user_id == user_id
-        ).group_by(CrawlerTask.status).all()
-        
-        # 最近一周趋势
-        weekly_trend = db.session.query(
-            db.func.date(CrawlerTask.created_at),
-            db.func.count(CrawlerTask.id)
-        ).filter(
-            CrawlerTask.user_id == user_id,
-            CrawlerTask.created_at >= last_week
-        ).group_by(
-            db.func.date(CrawlerTask.created_at)
-        ).all()
+        total_stats, weekly_trend = get_task_stats(current_app.redis, user_id)
         
         return {
-            'total_stats': dict(total_stats),
-            'weekly_trend': {
-                str(date): count 
-                for date, count in weekly_trend
-            }
+            'total_stats': total_stats,
+            'weekly_trend': weekly_trend
         }
 
 class TaskActionAPI(Resource):
     @jwt_required()
     def post(self, task_id, action):
         """任务操作（暂停/恢复/取消）"""
-        task = CrawlerTask.query.get_or_404(task_id)
+        task = CrawlTask.query.get_or_404(task_id)
         user_id = get_jwt_identity()
         
-        if task.user_id != user_id:
+        if task.created_by != user_id:
             return {'error': 'Unauthorized'}, 403
             
         if action == 'pause':
             if task.status == 'running':
                 task.status = 'paused'
                 db.session.commit()
+                record_status_change(current_app.redis, user_id, 'running', 'paused')
+                set_task_control(current_app.redis, task_id, task.status)
                 return {'status': 'paused'}
         elif action == 'resume':
             if task.status == 'paused':
                 task.status = 'running'
                 db.session.commit()
+                record_status_change(current_app.redis, user_id, 'paused', 'running')
+                set_task_control(current_app.redis, task_id, task.status)
+                
+                # 重新派发任务，worker 会从断点继续
+                settings = task.config or {}
+                for _ in range(max(1, int(settings.get('workers', 1)))):
+                    celery.send_task(
+                        'tasks.crawl_task',
+                        args=[task_id, task.urls, task.depth],
+                        kwargs={'settings': settings}
+                    )
                 return {'status': 'running'}
         elif action == 'cancel':
             if task.status in ['running', 'paused', 'pending']:
+                previous_status = task.status
                 task.status = 'cancelled'
                 db.session.commit()
+                record_status_change(current_app.redis, user_id, previous_status, 'cancelled')
+                set_task_control(current_app.redis, task_id, task.status)
                 return {'status': 'cancelled'}
                 
         return {'error': 'Invalid action'}, 400
@@ -8,9 +8,10 @@ from flask_talisman import Talisman
 from celery import Celery
 from dotenv import load_dotenv
 import os
-import redis
+from config import Config
 from models import db, init_db
 from api import init_api
+from services.redis_client import get_redis
 from services.websocket import socketio, init_app as init_socketio
 from middleware.performance import init_performance_monitoring
 from monitoring import init_monitoring
@@ -81,13 +82,8 @@ def create_app():
     }
 
     # Redis配置
-    app.config['REDIS_URL'] = os.getenv('REDIS_URL', 'redis://redis:6379/0')
-    app.redis = redis.from_url(
-        app.config['REDIS_URL'],
-        decode_responses=True,
-        socket_timeout=5,
-        socket_connect_timeout=5
-    )
+    app.config['REDIS_URL'] = Config.REDIS_URL
+    app.redis = get_redis()
 
     # JWT配置
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')
@@ -1,9 +1,9 @@
 from flask import Flask
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+# 模型定义在 models.db 上，API 和 worker 共用同一个实例
+from models import db
 
-db = SQLAlchemy()
 jwt = JWTManager()
 
 def create_app():
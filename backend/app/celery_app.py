@@ -5,6 +5,8 @@ def create_celery_app(app=None):
         'happyseek',
         include=['app.tasks']
     )
+    # 读取 Config 中 CELERY_ 开头的配置（broker、序列化、acks_late 等）
+    celery.config_from_object('config.Config', namespace='CELERY')
 
     if app:
         celery.conf.update(app.config)
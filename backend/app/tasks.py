@@ -1,5 +1,178 @@
+import asyncio
+import logging
+from celery.signals import worker_process_shutdown
 from app.celery_app import celery
+from config import Config
+from crawler.browser_pool import browser_pool
+from crawler.engine import SmartCrawler
+from crawler.login_detection import login_detector
+from services.http_client import close_session
+from services.redis_client import get_redis
+from services.task_stats import record_status_change, replace_task_stats
+from services.websocket import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+# worker 进程内常驻的事件循环，让浏览器池在多个任务之间复用
+_loop = None
+
+def run_async(coro):
+    """在 worker 的常驻事件循环上执行协程"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+@worker_process_shutdown.connect
+def close_browser_pool(**kwargs):
+    if _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(browser_pool.close())
+        _loop.run_until_complete(close_session())
+        _loop.close()
 
 @celery.task
 def test_task():
-    return "Task completed successfully"
\ No newline at end of file
+    return "Task completed successfully"
+
+async def _create_crawler(task_id, settings, reporter=None):
+    # 在事件循环内创建，爬虫使用该循环共享的 Redis 连接池
+    return SmartCrawler(task_id, settings, reporter=reporter)
+
+def _set_status(task_id, old_statuses, new_status):
+    """任务仍处于 old_statuses 之一时改为 new_status，返回是否修改
+
+    用条件 UPDATE 实现，同一任务的多个 worker 中只有一个会修改成功，
+    任务统计汇总也只记录一次。
+    """
+    from models import CrawlTask, db
+
+    task = db.session.query(CrawlTask.created_by, CrawlTask.status)\
+        .filter(CrawlTask.id == task_id).first()
+    if task is None or task.status not in old_statuses:
+        return False
+    updated = CrawlTask.query\
+        .filter(CrawlTask.id == task_id, CrawlTask.status == task.status)\
+        .update({'status': new_status}, synchronize_session=False)
+    db.session.commit()
+    if updated:
+        record_status_change(get_redis(), task.created_by, task.status, new_status)
+    return bool(updated)
+
+def _finish_task(task_id, status, result_stats):
+    """保存抓取统计；正常结束或出错时把任务从 running 改为最终状态，返回是否修改了状态
+
+    暂停和取消由 TaskActionAPI 修改状态，这里只保存统计。
+    """
+    from models import CrawlTask, db
+
+    try:
+        if result_stats is not None:
+            CrawlTask.query.filter(CrawlTask.id == task_id)\
+                .update({'result_stats': result_stats}, synchronize_session=False)
+            db.session.commit()
+        if status in ('completed', 'failed'):
+            return _set_status(task_id, ('running',), status)
+    except Exception:
+        db.session.rollback()
+        logger.exception(f'Failed to save final state of task {task_id}')
+    return False
+
+def _report_final(reporter, status, result_stats, error=None):
+    """推送任务的最终状态，终止状态会立即送达客户端"""
+    pages = result_stats['pages_crawled'] if result_stats else 0
+    if status == 'completed':
+        reporter.update(100, status, f'任务完成，共抓取 {pages} 个页面', pages_crawled=pages)
+    elif status == 'failed':
+        reporter.update(None, status, error or '任务失败', pages_crawled=pages)
+    else:
+        messages = {'paused': '任务已暂停', 'cancelled': '任务已取消'}
+        reporter.update(None, status, messages.get(status, ''), pages_crawled=pages)
+
+# 超过 CRAWL_MAX_DURATION 时协程内取消抓取；硬超时只作为兜底，保证在 visibility_timeout 之前结束
+@celery.task(name='tasks.crawl_task', time_limit=Config.CRAWL_MAX_DURATION + 600)
+def crawl_task(task_id, urls, depth=2, settings=None):
+    """执行爬虫任务，开始时把任务标记为 running，结束时保存最终状态和统计"""
+    if isinstance(urls, str):
+        urls = [urls]
+
+    reporter = ProgressReporter(task_id)
+    if _set_status(task_id, ('pending',), 'running'):
+        reporter.update(0, 'running', '开始抓取')
+    crawler = None
+    status = 'failed'
+    error = None
+    try:
+        crawler = run_async(_create_crawler(task_id, settings, reporter))
+        run_async(asyncio.wait_for(crawler.adaptive_crawl(urls, depth), Config.CRAWL_MAX_DURATION))
+        status = crawler.crawl_stats['status']
+        return _result_stats(crawler)
+    except asyncio.TimeoutError:
+        error = f'任务超过最长运行时间 {Config.CRAWL_MAX_DURATION} 秒'
+        raise
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        result_stats = _result_stats(crawler) if crawler else None
+        # 多 worker 任务只由修改了最终状态的 worker 推送完成或失败；暂停和取消每个 worker 都会结束
+        if _finish_task(task_id, status, result_stats) or status in ('paused', 'cancelled'):
+            _report_final(reporter, status, result_stats, error)
+
+def _result_stats(crawler):
+    return {
+        'status': crawler.crawl_stats.get('status', 'failed'),
+        'pages_crawled': crawler.crawl_stats['pages_crawled'],
+        'elements_found': crawler.crawl_stats['elements_found'],
+        'errors': crawler.crawl_stats['errors'],
+        'fetch_tiers': crawler.crawl_stats['fetch_tiers'],
+        'bandwidth': crawler.crawl_stats['bandwidth'],
+        'sink': crawler.crawl_stats['sink'],
+        'dedup': crawler.crawl_stats['dedup'],
+        'incremental': crawler.crawl_stats['incremental']
+    }
+
+@celery.task(name='tasks.detect_login')
+def detect_login(url):
+    """浏览器检测页面是否需要登录（HTTP 探测无法判断时由 API 派发）"""
+    verdict = run_async(login_detector.detect(url))
+    return dict(verdict, url=url)
+
+@celery.task(name='tasks.backfill_task_stats')
+def backfill_task_stats(user_id=None):
+    """从数据库重建任务统计汇总，user_id 为空时处理所有用户"""
+    from models import CrawlTask, db
+
+    query = db.session.query(
+        CrawlTask.created_by,
+        CrawlTask.status,
+        db.func.count(CrawlTask.id)
+    )
+    if user_id is not None:
+        query = query.filter(CrawlTask.created_by == user_id)
+    status_rows = query.group_by(CrawlTask.created_by, CrawlTask.status).all()
+
+    query = db.session.query(
+        CrawlTask.created_by,
+        db.func.date(CrawlTask.created_at),
+        db.func.count(CrawlTask.id)
+    )
+    if user_id is not None:
+        query = query.filter(CrawlTask.created_by == user_id)
+    daily_rows = query.group_by(CrawlTask.created_by, db.func.date(CrawlTask.created_at)).all()
+
+    status_counts = {}
+    for owner, status, count in status_rows:
+        status_counts.setdefault(owner, {})[status] = count
+    daily_counts = {}
+    for owner, day, count in daily_rows:
+        daily_counts.setdefault(owner, {})[str(day)] = count
+
+    redis_client = get_redis()
+    users = set(status_counts) | set(daily_counts)
+    for owner in users:
+        replace_task_stats(
+            redis_client, owner,
+            status_counts.get(owner, {}), daily_counts.get(owner, {})
+        )
+    return {'users': len(users)}
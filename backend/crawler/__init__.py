@@ -0,0 +1 @@
+# 爬虫引擎及其组件：浏览器池、调度队列、抓取、限速、代理、断点等
@@ -1,12 +1,14 @@
-# backend/crawler.py
+# backend/crawler/advanced.py
+from services.websocket import progress_aggregator
+
 class AdvancedCrawler:
     def __init__(self, task_id):
         self.task_id = task_id
-        self.redis = redis.StrictRedis(host='localhost', port=6379, db=1)
 
     async def update_progress(self, current, total):
+        # 只在内存中合并，由后台线程限流写入 Redis 并推送
         progress = int((current / total) * 100)
-        self.redis.hset(self.task_id, 'progress', str(progress))
+        progress_aggregator.update(self.task_id, progress=progress, current=current, total=total)
 
     async def run(self, urls, max_depth):
         total_urls = len(urls)
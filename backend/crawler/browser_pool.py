@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+
+import psutil
+from playwright.async_api import async_playwright
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 浏览器池指标
+BROWSER_POOL_REQUESTS = Counter(
+    'crawler_browser_pool_requests_total',
+    'Browser pool acquisitions by result',
+    ['result']
+)
+
+BROWSER_LAUNCH_LATENCY = Histogram(
+    'crawler_browser_launch_seconds',
+    'Chromium launch latency in seconds'
+)
+
+BROWSER_RECYCLES = Counter(
+    'crawler_browser_recycles_total',
+    'Browsers recycled by reason',
+    ['reason']
+)
+
+BROWSER_OPEN_PAGES = Gauge(
+    'crawler_browser_open_pages',
+    'Pages currently open in the browser pool'
+)
+
+BROWSER_COUNT = Gauge(
+    'crawler_browser_instances',
+    'Chromium instances currently held by the pool'
+)
+
+
+class _PooledBrowser:
+    """池中的单个浏览器实例"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active = 0
+        self.retiring = False
+        self.launched_at = time.time()
+
+
+class BrowserPool:
+    """每个 worker 进程共享的 Playwright 浏览器池
+
+    浏览器常驻复用，每次取页面都会新建一个隔离的 BrowserContext，
+    按需设置代理和 UA；浏览器服务页面数或内存超限后自动回收。
+    """
+
+    def __init__(self, max_browsers=2, max_pages=8, max_pages_per_browser=200,
+                 memory_limit_mb=1024, headless=True):
+        self.max_browsers = max_browsers
+        self.max_pages = max_pages
+        self.max_pages_per_browser = max_pages_per_browser
+        self.memory_limit = memory_limit_mb * 1024 * 1024
+        self.headless = headless
+
+        self._playwright = None
+        self._driver_pids = set()
+        self._loop = None
+        self._browsers = []
+        self._lock = None
+        self._page_slots = None
+        self._start_locks = weakref.WeakKeyDictionary()
+        self._stats = {'hits': 0, 'misses': 0, 'launches': 0, 'recycled': 0}
+
+    async def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._playwright is not None and self._loop is loop:
+            return
+
+        # 并发的首批调用只启动一次 Playwright
+        start_lock = self._start_locks.get(loop)
+        if start_lock is None:
+            start_lock = self._start_locks[loop] = asyncio.Lock()
+        async with start_lock:
+            if self._playwright is not None and self._loop is loop:
+                return
+
+            if self._playwright is not None:
+                # Playwright 对象绑定在创建它的事件循环上，循环变化后关闭旧实例再重建
+                logger.warning('Event loop changed, discarding stale browser pool')
+                await self._discard_stale()
+
+            lock = asyncio.Lock()
+            page_slots = asyncio.Semaphore(self.max_pages)
+            before = self._child_pids()
+            playwright = await async_playwright().start()
+            self._driver_pids = self._child_pids() - before
+            self._lock = lock
+            self._page_slots = page_slots
+            self._playwright = playwright
+            self._loop = loop
+
+    def _child_pids(self):
+        try:
+            return {child.pid for child in psutil.Process(os.getpid()).children()}
+        except psutil.Error:
+            return set()
+
+    async def _discard_stale(self):
+        """释放绑定在旧事件循环上的浏览器和 Playwright 驱动"""
+        old_loop, playwright, browsers = self._loop, self._playwright, self._browsers
+        driver_pids, self._driver_pids = self._driver_pids, set()
+        self._playwright = None
+        self._browsers = []
+        BROWSER_COUNT.set(0)
+
+        if old_loop is not None and old_loop.is_running():
+            # 旧循环仍在其他线程运行，交给它正常关闭
+            future = asyncio.run_coroutine_threadsafe(self._shutdown(playwright, browsers), old_loop)
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(future), timeout=30)
+                return
+            except Exception as e:
+                logger.warning(f'Failed to close stale browser pool: {e}')
+
+        # 旧循环已停止，无法再驱动 Playwright，直接结束驱动进程及其浏览器
+        await asyncio.to_thread(self._terminate, driver_pids)
+
+    @staticmethod
+    def _terminate(pids):
+        processes = []
+        for pid in pids:
+            try:
+                process = psutil.Process(pid)
+                processes.extend(process.children(recursive=True))
+                processes.append(process)
+            except psutil.Error:
+                continue
+        for process in processes:
+            try:
+                process.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(processes, timeout=5)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+
+    @staticmethod
+    async def _shutdown(playwright, browsers):
+        for pooled in browsers:
+            try:
+                await pooled.browser.close()
+            except Exception as e:
+                logger.warning(f'Failed to close browser: {e}')
+        await playwright.stop()
+
+    async def _launch(self):
+        start = time.perf_counter()
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        duration = time.perf_counter() - start
+        BROWSER_LAUNCH_LATENCY.observe(duration)
+        self._stats['launches'] += 1
+        logger.info(f'Launched chromium in {duration:.2f}s')
+
+        pooled = _PooledBrowser(browser)
+        self._browsers.append(pooled)
+        BROWSER_COUNT.set(len(self._browsers))
+        return pooled
+
+    def _browser_memory(self):
+        """当前进程下所有浏览器子进程的 RSS 总和"""
+        try:
+            children = psutil.Process(os.getpid()).children(recursive=True)
+        except psutil.Error:
+            return 0
+
+        total = 0
+        for child in children:
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def _check_recycle(self, pooled):
+        if pooled.retiring:
+            return
+        if pooled.pages_served >= self.max_pages_per_browser:
+            pooled.retiring = True
+            BROWSER_RECYCLES.labels('pages').inc()
+        elif self._browser_memory() > self.memory_limit:
+            pooled.retiring = True
+            BROWSER_RECYCLES.labels('memory').inc()
+
+    async def _acquire_browser(self):
+        async with self._lock:
+            candidates = [
+                b for b in self._browsers
+                if not b.retiring and b.browser.is_connected()
+            ]
+            if candidates:
+                pooled = min(candidates, key=lambda b: b.active)
+                if pooled.active == 0 or len(self._browsers) >= self.max_browsers:
+                    self._stats['hits'] += 1
+                    BROWSER_POOL_REQUESTS.labels('hit').inc()
+                    pooled.active += 1
+                    return pooled
+
+            self._stats['misses'] += 1
+            BROWSER_POOL_REQUESTS.labels('miss').inc()
+            pooled = await self._launch()
+            pooled.active += 1
+            return pooled
+
+    async def _release_browser(self, pooled):
+        async with self._lock:
+            pooled.active -= 1
+            pooled.pages_served += 1
+            self._check_recycle(pooled)
+
+            if (pooled.retiring or not pooled.browser.is_connected()) and pooled.active == 0:
+                self._browsers.remove(pooled)
+                BROWSER_COUNT.set(len(self._browsers))
+                self._stats['recycled'] += 1
+                try:
+                    await pooled.browser.close()
+                except Exception as e:
+                    logger.warning(f'Failed to close recycled browser: {e}')
+
+    @asynccontextmanager
+    async def new_page(self, proxy=None, user_agent=None, **context_args):
+        """获取一个隔离上下文中的新页面，退出时关闭上下文"""
+        await self._ensure_started()
+
+        async with self._page_slots:
+            pooled = await self._acquire_browser()
+            context = None
+            try:
+                if proxy:
+                    context_args['proxy'] = proxy
+                if user_agent:
+                    context_args['user_agent'] = user_agent
+                context = await pooled.browser.new_context(**context_args)
+                page = await context.new_page()
+                BROWSER_OPEN_PAGES.inc()
+                try:
+                    yield page
+                finally:
+                    BROWSER_OPEN_PAGES.dec()
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f'Failed to close browser context: {e}')
+                await self._release_browser(pooled)
+
+    def stats(self):
+        """返回池的命中与回收统计"""
+        return {
+            **self._stats,
+            'browsers': len(self._browsers),
+            'active_contexts': sum(b.active for b in self._browsers)
+        }
+
+    async def close(self):
+        """关闭所有浏览器并停止 Playwright"""
+        playwright, browsers = self._playwright, self._browsers
+        self._playwright = None
+        self._browsers = []
+        self._driver_pids = set()
+        BROWSER_COUNT.set(0)
+
+        if playwright is not None:
+            await self._shutdown(playwright, browsers)
+
+
+# 进程级浏览器池实例
+browser_pool = BrowserPool(
+    max_browsers=Config.BROWSER_POOL_MAX_BROWSERS,
+    max_pages=Config.BROWSER_POOL_MAX_PAGES,
+    max_pages_per_browser=Config.BROWSER_POOL_PAGES_PER_BROWSER,
+    memory_limit_mb=Config.BROWSER_POOL_MEMORY_LIMIT_MB
+)
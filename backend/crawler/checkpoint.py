@@ -0,0 +1,106 @@
+import asyncio
+import base64
+import json
+import time
+import zlib
+from services.redis_client import get_async_redis
+
+
+class CrawlCheckpoint:
+    """爬取断点：周期性保存调度队列和统计，worker 重启或恢复暂停后续爬
+
+    已完成的 URL 和新见到的 URL 增量写入 Redis 集合，每次保存的开销与
+    已爬页面数无关；待爬队列快照和统计按时间间隔或页面数整体覆盖保存，
+    序列化和压缩在线程中进行，不阻塞事件循环。
+    """
+
+    def __init__(self, task_id, redis_client=None, interval=30, every_pages=50,
+                 ttl=7 * 24 * 3600):
+        self.task_id = task_id
+        self.interval = interval
+        self.every_pages = every_pages
+        self.ttl = ttl
+        self.redis = redis_client or get_async_redis()
+
+        self.state_key = f'crawl:{{{task_id}}}:checkpoint'
+        self.completed_key = f'crawl:{{{task_id}}}:completed'
+        self.seen_key = f'crawl:{{{task_id}}}:checkpoint:seen'
+
+        self._completed = []
+        self._last_saved = time.monotonic()
+        self._saving = asyncio.Lock()
+
+    async def load(self):
+        """读取上次的断点，没有时返回 None"""
+        state = await self.redis.hgetall(self.state_key)
+        if not state:
+            return None
+
+        frontier = None
+        if state.get('frontier'):
+            frontier = await asyncio.to_thread(_decode, state['frontier'])
+            seen = await self.redis.smembers(self.seen_key)
+            # 旧格式的断点把完整 seen-set 放在快照中
+            frontier['seen'] = list(seen.union(frontier.get('seen', ())))
+
+        return {
+            'frontier': frontier,
+            'stats': json.loads(state.get('stats', '{}')),
+            'completed': await self.redis.scard(self.completed_key)
+        }
+
+    def mark_completed(self, url):
+        self._completed.append(url)
+
+    async def maybe_save(self, frontier, stats):
+        """达到保存间隔时写入断点"""
+        due = (
+            len(self._completed) >= self.every_pages
+            or time.monotonic() - self._last_saved >= self.interval
+        )
+        if due and not self._saving.locked():
+            await self.save(frontier, stats)
+
+    async def save(self, frontier, stats):
+        async with self._saving:
+            completed, self._completed = self._completed, []
+            snapshot = frontier.snapshot()
+
+            mapping = {
+                'stats': json.dumps(stats, default=str),
+                'updated_at': time.time()
+            }
+            new_seen = []
+            if snapshot is not None:
+                new_seen = snapshot['new_seen']
+                mapping['frontier'] = await asyncio.to_thread(
+                    _encode, {'pending': snapshot['pending']}
+                )
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(self.state_key, mapping=mapping)
+                pipe.expire(self.state_key, self.ttl)
+                if completed:
+                    pipe.sadd(self.completed_key, *completed)
+                    pipe.expire(self.completed_key, self.ttl)
+                if new_seen:
+                    pipe.sadd(self.seen_key, *new_seen)
+                    pipe.expire(self.seen_key, self.ttl)
+                await pipe.execute()
+
+            if snapshot is not None:
+                frontier.mark_seen_saved(len(new_seen))
+            self._last_saved = time.monotonic()
+
+    async def clear(self):
+        """任务完成或取消后删除断点"""
+        self._completed = []
+        await self.redis.delete(self.state_key, self.completed_key, self.seen_key)
+
+
+def _encode(value):
+    return base64.b64encode(zlib.compress(json.dumps(value).encode())).decode()
+
+
+def _decode(value):
+    return json.loads(zlib.decompress(base64.b64decode(value)))
@@ -0,0 +1,119 @@
+import hashlib
+import re
+from array import array
+
+from prometheus_client import Counter
+
+DEDUP_ITEMS = Counter(
+    'crawler_dedup_items_total',
+    'Extracted items by dedup result',
+    ['result']
+)
+
+WHITESPACE = re.compile(r'\s+')
+NON_WORD = re.compile(r'\W+')
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data.encode(), digest_size=8).digest(), 'big')
+
+
+def normalize_text(text):
+    return WHITESPACE.sub(' ', text).strip().lower()
+
+
+def simhash(text, shingle_size=4):
+    """64 位 SimHash，按字符 shingle 计算，对中英文都适用
+
+    忽略空白和标点。数字保留在指纹中：订单号、价格不同的页面内容不同，
+    不能当作近似重复。
+    """
+    compact = NON_WORD.sub('', text)
+    if len(compact) <= shingle_size:
+        shingles = [compact]
+    else:
+        shingles = {compact[i:i + shingle_size] for i in range(len(compact) - shingle_size + 1)}
+
+    weights = [0] * 64
+    for shingle in shingles:
+        h = _hash64(shingle)
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class ContentDeduplicator:
+    """任务内的提取结果去重
+
+    先按内容哈希精确去重，再用 SimHash 检测近似重复的文本。指纹分成
+    max_distance + 1 段建索引，海明距离不超过 max_distance 的指纹至少
+    有一段完全相同，只需比较同段候选。max_distance 为负数时关闭近似去重。
+    """
+
+    def __init__(self, max_distance=5):
+        self.max_distance = max_distance
+        self.stats = {'seen': 0, 'exact': 0, 'near': 0, 'ratio': 0.0}
+
+        self._hashes = set()
+        self.band_count = max(max_distance, 0) + 1
+        self.band_bits = 64 // self.band_count
+        self._bands = [{} for _ in range(self.band_count)]
+
+    def filter(self, items):
+        """返回去掉重复项后的结果列表"""
+        unique = []
+        for item in items:
+            result = self._check(item)
+            DEDUP_ITEMS.labels(result).inc()
+            self.stats['seen'] += 1
+            if result == 'unique':
+                unique.append(item)
+            else:
+                self.stats[result] += 1
+
+        if self.stats['seen']:
+            duplicates = self.stats['exact'] + self.stats['near']
+            self.stats['ratio'] = round(duplicates / self.stats['seen'], 4)
+        return unique
+
+    def _check(self, item):
+        if item.get('type') == 'text':
+            key = normalize_text(item.get('content', ''))
+        else:
+            key = item.get('src', '')
+
+        digest = _hash64(f"{item.get('type')}:{key}")
+        if digest in self._hashes:
+            return 'exact'
+        self._hashes.add(digest)
+
+        if item.get('type') == 'text' and self.max_distance >= 0:
+            fingerprint = simhash(key)
+            if self._near_duplicate(fingerprint):
+                return 'near'
+            self._index(fingerprint)
+
+        return 'unique'
+
+    def _band_values(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [fingerprint >> (i * self.band_bits) & mask for i in range(self.band_count)]
+
+    def _near_duplicate(self, fingerprint):
+        for band, value in zip(self._bands, self._band_values(fingerprint)):
+            for candidate in band.get(value, ()):
+                if bin(candidate ^ fingerprint).count('1') <= self.max_distance:
+                    return True
+        return False
+
+    def _index(self, fingerprint):
+        for band, value in zip(self._bands, self._band_values(fingerprint)):
+            bucket = band.get(value)
+            if bucket is None:
+                bucket = band[value] = array('Q')
+            bucket.append(fingerprint)
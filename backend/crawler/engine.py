@@ -1,123 +1,614 @@
-from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 import asyncio
 import json
+import logging
+from contextlib import aclosing
 from datetime import datetime
-from .proxy_pool import ProxyPool
+from urllib.parse import urlsplit
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from .browser_pool import browser_pool
+from .checkpoint import CrawlCheckpoint
+from .dedup import ContentDeduplicator
+from .fetch_meta import FetchMetaStore, content_fingerprint, parse_lastmod
+from .fetcher import HTTP_TIER_ERRORS, HttpFetcher, check_response_status, render_decisions, response_validators
+from .frontier import UrlFrontier, normalize_url
+from .login_detection import login_detector
+from .redis_frontier import RedisFrontier
+from .resource_blocker import ResourceBlocker
+from .robots import RobotsCache
+from .session_store import LoginFailed, SessionStore, cookie_header, credential_id, open_login
+from .sink import ResultSink, WRITERS
+from .sitemap import default_sitemap_url, iter_sitemap
+from .proxy_pool import proxy_pool
+from .rate_limiter import DomainRateLimiter, RateLimited, capped_rate, registered_domain
+from .retry import SWITCH_PROXY, ErrorStats, RetryPolicy, classify_error
 from .anti_anti_crawl import AntiAntiCrawler
+from services.redis_client import get_async_redis
+from services.task_control import CONTROL_KEY
+
+logger = logging.getLogger(__name__)
+
+# 页面分析脚本：链接、表单、登录检测和内容提取一次完成
+PAGE_ANALYSIS_SCRIPT = '''(options) => {
+    const content = [];
+    
+    // 提取文本内容，包含段落的 article 由内部段落表示，避免重复输出
+    document.querySelectorAll('p, h1, h2, h3, article').forEach(el => {
+        if (el.tagName === 'ARTICLE' && el.querySelector('p, h1, h2, h3, article')) {
+            return;
+        }
+        if (el.textContent.trim().length > 50) {
+            content.push({
+                type: 'text',
+                content: el.textContent.trim(),
+                element: el.tagName
+            });
+        }
+    });
+    
+    // 提取图片，图片被拦截时退回到声明的宽高，无法判断尺寸的也保留
+    document.querySelectorAll('img').forEach(img => {
+        let width = img.naturalWidth;
+        let height = img.naturalHeight;
+        if (!width && options.imagesBlocked) {
+            width = parseInt(img.getAttribute('width')) || 0;
+            height = parseInt(img.getAttribute('height')) || 0;
+        }
+        const unknownSize = options.imagesBlocked && !width && !height;
+        if (unknownSize || (width > 100 && height > 100)) {
+            content.push({
+                type: 'image',
+                src: img.src,
+                alt: img.alt
+            });
+        }
+    });
+    
+    return {
+        links: Array.from(document.querySelectorAll('a')).map(a => ({
+            href: a.href,
+            text: a.textContent.trim(),
+            location: {
+                x: a.getBoundingClientRect().x,
+                y: a.getBoundingClientRect().y
+            }
+        })),
+        forms: Array.from(document.querySelectorAll('form')).map(form => ({
+            action: form.action,
+            method: form.method,
+            fields: Array.from(form.elements).map(el => ({
+                name: el.name,
+                type: el.type
+            }))
+        })),
+        possibleLoginForm: document.querySelector('input[type="password"]') !== null,
+        content: content
+    };
+}'''
+
+DEFAULT_USERNAME_SELECTOR = (
+    'input[type="email"], input[name*="user" i], input[name*="login" i], '
+    'input[name*="account" i], input[type="text"]'
+)
+DEFAULT_PASSWORD_SELECTOR = 'input[type="password"]'
 
 class SmartCrawler:
-    def __init__(self, task_id):
+    def __init__(self, task_id, settings=None, reporter=None):
         self.task_id = task_id
-        self.proxy_pool = ProxyPool()
+        self.settings = settings or {}
+        # 进度推送（ProgressReporter），在轮询控制状态时顺带上报
+        self.reporter = reporter
+        self.concurrency = int(self.settings.get('concurrency', 4))
+        # 同一 host 同时进行的请求数上限，进程内队列和 Redis 队列一致
+        self.host_concurrency = int(self.settings.get('hostConcurrency', 4))
+        self.delay = float(self.settings.get('delay', 1.0))
+        self.distributed = int(self.settings.get('workers', 1)) > 1
+        self.wait_until = self.settings.get('waitUntil', 'domcontentloaded')
+        self.settle_timeout = int(self.settings.get('settleTimeout', 2000))
+        self.render_mode = self.settings.get('renderMode', 'auto')
+        self.render_hosts = set(self.settings.get('renderHosts', []))
+        self.http_fetcher = HttpFetcher()
+        self.resource_blocker = ResourceBlocker(
+            resource_types=self.settings.get('blockResources', ['image', 'media', 'font']),
+            block_trackers=self.settings.get('blockTrackers', True)
+        )
+        self.control_interval = float(self.settings.get('controlInterval', 2.0))
+        self.use_proxy = self.settings.get('useProxy', True)
+        self.sticky_proxy = self.settings.get('stickyProxy', False)
+        self.proxy_pool = proxy_pool
         self.anti_crawler = AntiAntiCrawler()
+        # 共享当前事件循环的连接池，需在协程中创建 SmartCrawler
+        self.redis = get_async_redis()
+        self.checkpoint = CrawlCheckpoint(task_id, redis_client=self.redis)
+        self.respect_robots = self.settings.get('respectRobots', True)
+        self.robots = RobotsCache(redis_client=self.redis)
+        self._host_delays_applied = set()
+        # 自适应限速需显式开启：delay 仍是速率上限，只在站点限流或变慢时降速
+        self.adaptive_rate = self.settings.get('adaptiveRate', False)
+        max_rate = capped_rate(float(self.settings.get('maxRequestsPerSecond', 4.0)), self.delay)
+        self.rate_limiter = DomainRateLimiter(
+            redis_client=self.redis,
+            rate=max_rate,
+            max_rate=max_rate
+        )
+        self.incremental = self.settings.get('incremental', True)
+        self.fetch_meta = FetchMetaStore(task_id, redis_client=self.redis)
+        self._sitemap_fresh = set()
+        self.deduplicator = ContentDeduplicator(
+            max_distance=int(self.settings.get('nearDuplicateDistance', 5))
+        )
+        self.sink = ResultSink(
+            WRITERS[self.settings.get('resultSink', 'mysql')](),
+            batch_size=int(self.settings.get('sinkBatchSize', 500))
+        )
+        # 登录态：settings.login 为 seal_login 加密后的 {url, username, password, 可选的各输入框选择器}
+        self.login = open_login(self.settings.get('login'))
+        self.sessions = None
+        if self.login:
+            self.sessions = SessionStore(redis_client=self.redis)
+            self._credential = credential_id(self.login['url'], self.login['username'])
+            self._login_domain = registered_domain(self.login['url'])
+        self.retry_policy = RetryPolicy(
+            max_retries=int(self.settings.get('maxRetries', 3)),
+            base_delay=float(self.settings.get('retryDelay', 2.0))
+        )
+        self.errors = ErrorStats()
+        self._failed_proxies = {}
+        self.stop_reason = None
         self.crawl_stats = {
             'start_time': datetime.now(),
             'pages_crawled': 0,
             'elements_found': 0,
-            'errors': []
+            'errors': self.errors.stats,
+            'fetch_tiers': {'http': 0, 'browser': 0},
+            'robots_blocked': 0,
+            'throttled': 0,
+            'bandwidth': self.resource_blocker.stats,
+            'sink': self.sink.stats,
+            'dedup': self.deduplicator.stats,
+            'incremental': {'not_modified': 0, 'unchanged': 0, 'sitemap_skipped': 0}
         }
         
     async def detect_site_structure(self, url):
         """智能识别网站结构"""
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            try:
-                await page.goto(url, wait_until='networkidle')
-                
-                # 分析页面结构
-                structure = await page.evaluate('''() => {
-                    return {
-                        links: Array.from(document.querySelectorAll('a')).map(a => ({
-                            href: a.href,
-                            text: a.textContent.trim(),
-                            location: {
-                                x: a.getBoundingClientRect().x,
-                                y: a.getBoundingClientRect().y
-                            }
-                        })),
-                        forms: Array.from(document.querySelectorAll('form')).map(form => ({
-                            action: form.action,
-                            method: form.method,
-                            fields: Array.from(form.elements).map(el => ({
-                                name: el.name,
-                                type: el.type
-                            }))
-                        })),
-                        possibleLoginForm: document.querySelector('input[type="password"]') !== null
-                    }
-                }''')
-                
-                return structure
-                
-            finally:
-                await browser.close()
+        async with browser_pool.new_page() as page:
+            await self._load_page(page, url)
+            return await self._analyze_page(page)
+    
+    async def detect_login_requirement(self, url):
+        """检测页面是否需要登录，优先 HTTP 探测，必要时使用浏览器"""
+        verdict = await login_detector.detect(url)
+        return verdict['requiresLogin']
     
     async def adaptive_crawl(self, url, depth=2):
-        """自适应爬取策略"""
-        structure = await self.detect_site_structure(url)
-        browser_context_args = {
-            'proxy': self.proxy_pool.get_random(),
-            'viewport': {'width': 1920, 'height': 1080},
-            'user_agent': self.anti_crawler.get_random_ua()
+        """自适应爬取策略：广度优先、有界并发地抓取站点，支持断点续爬"""
+        frontier = self._create_frontier(depth)
+        
+        state = None if self.distributed else await self.checkpoint.load()
+        if state:
+            frontier.restore(state['frontier'])
+            self._restore_stats(state['stats'])
+        else:
+            seeds = [url] if isinstance(url, str) else url
+            for seed in seeds:
+                await frontier.put(seed, 0)
+            if self.settings.get('useSitemap'):
+                await self._seed_from_sitemaps(frontier, seeds)
+        
+        await self.sink.start()
+        workers = [
+            asyncio.create_task(self._crawl_worker(frontier))
+            for _ in range(self.concurrency)
+        ]
+        watcher = asyncio.create_task(self._watch_control(workers, frontier))
+        try:
+            await asyncio.gather(*workers, return_exceptions=True)
+        finally:
+            watcher.cancel()
+            await self.sink.close()
+        
+        if self.stop_reason == 'paused':
+            if not self.distributed:
+                await self.checkpoint.save(frontier, self._checkpoint_stats())
+        else:
+            await self.checkpoint.clear()
+            if self.distributed:
+                await frontier.clear()
+        self.crawl_stats['status'] = self.stop_reason or 'completed'
+        
+        return self.crawl_stats
+    
+    async def _seed_from_sitemaps(self, frontier, seeds):
+        """从 sitemap（含索引和 .xml.gz）流式读取 URL 作为种子
+        
+        增量重爬时 lastmod 晚于上次抓取（或从未抓取过）的 URL 先入队；
+        lastmod 表明未变化的 URL 排在最后，抓取时直接沿用上次的结果。
+        """
+        sitemap_urls = self.settings.get('sitemapUrls') or {
+            default_sitemap_url(seed) for seed in seeds
         }
+        limit = int(self.settings.get('maxSitemapUrls', 100000))
+        
+        added = 0
+        batch = []
+        unchanged = []
+        
+        async def flush():
+            nonlocal added
+            metas = {}
+            if self.incremental:
+                metas = await self.fetch_meta.get_many([url for url, _ in batch])
+            for url, lastmod in batch:
+                meta = metas.get(url)
+                if meta and lastmod and lastmod <= meta['crawled_at']:
+                    unchanged.append(url)
+                elif await frontier.put(url, 0):
+                    added += 1
+            batch.clear()
+        
+        for sitemap_url in sitemap_urls:
+            async with aclosing(iter_sitemap(sitemap_url)) as entries:
+                async for entry in entries:
+                    url = normalize_url(entry.loc)
+                    if url is None:
+                        continue
+                    batch.append((url, parse_lastmod(entry.lastmod)))
+                    if len(batch) >= 500:
+                        await flush()
+                    if added + len(unchanged) + len(batch) >= limit:
+                        break
+            if added + len(unchanged) + len(batch) >= limit:
+                break
+        await flush()
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(**browser_context_args)
+        for url in unchanged:
+            if await frontier.put(url, 0):
+                self._sitemap_fresh.add(url)
+                added += 1
+        self.crawl_stats['sitemap_seeds'] = added
+    
+    async def _watch_control(self, workers, frontier):
+        """轮询任务控制状态，暂停或取消时在一个轮询周期内停止抓取，同时上报进度"""
+        key = CONTROL_KEY.format(self.task_id)
+        while True:
+            status = await self.redis.get(key)
+            if status in ('paused', 'cancelled'):
+                self.stop_reason = status
+                for worker in workers:
+                    worker.cancel()
+                return
+            await self._report_progress(frontier)
+            await asyncio.sleep(self.control_interval)
+    
+    async def _report_progress(self, frontier):
+        """按已抓取页面占已发现 URL 的比例估算进度，结束前最多报 99%"""
+        if self.reporter is None:
+            return
+        seen = await frontier.count_seen() if self.distributed else frontier.seen_count
+        pages = self.crawl_stats['pages_crawled']
+        progress = min(99, pages * 100 // seen) if seen else 0
+        self.reporter.update(
+            progress, 'running', f'已抓取 {pages} 个页面，发现 {seen} 个链接',
+            pages_crawled=pages, urls_seen=seen
+        )
+    
+    def _checkpoint_stats(self):
+        return {
+            'pages_crawled': self.crawl_stats['pages_crawled'],
+            'elements_found': self.crawl_stats['elements_found'],
+            'fetch_tiers': self.crawl_stats['fetch_tiers'],
+            'robots_blocked': self.crawl_stats['robots_blocked'],
+            'throttled': self.crawl_stats['throttled'],
+            'bandwidth': self.crawl_stats['bandwidth'],
+            'sink': self.crawl_stats['sink'],
+            'dedup': self.crawl_stats['dedup'],
+            'incremental': self.crawl_stats['incremental'],
+            'errors': self.crawl_stats['errors']
+        }
+    
+    def _restore_stats(self, stats):
+        self.crawl_stats['pages_crawled'] = stats.get('pages_crawled', 0)
+        self.crawl_stats['elements_found'] = stats.get('elements_found', 0)
+        self.crawl_stats['robots_blocked'] = stats.get('robots_blocked', 0)
+        self.crawl_stats['throttled'] = stats.get('throttled', 0)
+        self.crawl_stats['fetch_tiers'].update(stats.get('fetch_tiers', {}))
+        bandwidth = dict(stats.get('bandwidth', {}))
+        # 旧断点中的字段名
+        if 'bytes_saved' in bandwidth:
+            bandwidth['estimated_bytes_saved'] = bandwidth.pop('bytes_saved')
+        self.crawl_stats['bandwidth'].update(bandwidth)
+        self.crawl_stats['sink'].update(stats.get('sink', {}))
+        self.crawl_stats['incremental'].update(stats.get('incremental', {}))
+        self.crawl_stats['dedup'].update(stats.get('dedup', {}))
+        if isinstance(stats.get('errors'), dict):
+            self.errors.restore(stats['errors'])
+    
+    def _create_frontier(self, depth):
+        """多 worker 任务共享 Redis 调度队列，否则使用进程内队列
+
+        启用自适应限速时请求间隔由限速器控制，队列只保留 Crawl-delay。
+        """
+        delay = 0 if self.adaptive_rate else self.delay
+        if self.distributed:
+            return RedisFrontier(
+                self.task_id, max_depth=depth, delay=delay,
+                host_concurrency=self.host_concurrency, redis_client=self.redis
+            )
+        return UrlFrontier(max_depth=depth, delay=delay, host_concurrency=self.host_concurrency)
+    
+    async def _crawl_worker(self, frontier):
+        """从调度队列中持续取 URL 抓取，直到队列耗尽"""
+        while True:
+            item = await frontier.get()
+            if item is None:
+                return
             
+            url, depth = item
+            fetched = False
             try:
-                page = await context.new_page()
-                await page.goto(url, wait_until='networkidle')
-                
-                # 智能提取关键信息
-                content = await self._extract_content(page)
-                self.crawl_stats['elements_found'] += len(content)
+                if not await self._robots_allowed(frontier, url):
+                    self.crawl_stats['robots_blocked'] += 1
+                    await self._finish(frontier, url)
+                    continue
                 
-                # 递归爬取子页面
-                if depth > 0:
-                    for link in structure['links']:
-                        try:
-                            await self.adaptive_crawl(link['href'], depth - 1)
-                        except Exception as e:
-                            self.crawl_stats['errors'].append({
-                                'url': link['href'],
-                                'error': str(e)
-                            })
+                content, links = await self._crawl_page(url)
+                fetched = True
+                content = self.deduplicator.filter(content)
                 
-                return content
+                # 逐页写入结果管道，管道积压时这里会等待
+                await self.sink.put_many(
+                    {**item, 'task_id': self.task_id, 'url': url} for item in content
+                )
                 
-            finally:
-                await browser.close()
+                for link in links:
+                    await frontier.put(link, depth + 1)
+            except asyncio.CancelledError:
+                # 暂停或取消时把未抓取的 URL 放回队列；已抓取的不再放回，避免恢复后重复抓取
+                try:
+                    if fetched:
+                        await frontier.done(url)
+                    else:
+                        await frontier.release(url, depth)
+                except Exception as e:
+                    logger.warning(f'Failed to release {url} on cancel: {e}')
+                raise
+            except Exception as e:
+                try:
+                    if await self._handle_failure(frontier, url, depth, e):
+                        continue
+                except Exception as bookkeeping_error:
+                    # 重试登记失败时按最终失败处理，保证租约被释放
+                    logger.warning(f'Failed to schedule retry for {url}: {bookkeeping_error}')
+                    self.errors.record(url, classify_error(e), e)
+            
+            await self._finish(frontier, url)
+    
+    async def _finish(self, frontier, url):
+        """释放租约并记录断点
+        
+        这里的 Redis 故障只记录日志：worker 退出会让租约一直占用，
+        其他 worker 在 frontier.get() 中永远等待。
+        """
+        try:
+            await frontier.done(url)
+        except Exception as e:
+            # 分布式队列的租约到期后会被重新领取
+            logger.warning(f'Failed to mark {url} done: {e}')
+        if not self.distributed:
+            self.checkpoint.mark_completed(url)
+            try:
+                await self.checkpoint.maybe_save(frontier, self._checkpoint_stats())
+            except Exception as e:
+                logger.warning(f'Failed to save checkpoint: {e}')
+    
+    async def _handle_failure(self, frontier, url, depth, error):
+        """按错误类别决定是否重试；放入延迟重试队列时返回 True
+        
+        重试在队列中等待退避时间，不占用 worker。
+        """
+        error_class = classify_error(error)
+        attempt = await frontier.count_failure(url)
+        if self.retry_policy.should_retry(error_class, attempt):
+            delay = self.retry_policy.backoff(attempt, getattr(error, 'retry_after', None))
+            self.errors.record_retry(error_class)
+            await frontier.retry(url, depth, delay)
+            return True
+        
+        self._failed_proxies.pop(url, None)
+        self.errors.record(url, error_class, error)
+        return False
+    
+    async def _robots_allowed(self, frontier, url):
+        """按 robots.txt 过滤 URL，并把 Crawl-delay 应用到该 host 的请求间隔"""
+        if not self.respect_robots:
+            return True
+        
+        policy = await self.robots.get_policy(url)
+        host = urlsplit(url).netloc
+        if host not in self._host_delays_applied:
+            self._host_delays_applied.add(host)
+            crawl_delay = policy.crawl_delay()
+            if crawl_delay:
+                await frontier.set_host_delay(host, crawl_delay)
+        
+        return policy.can_fetch(url)
+    
+    async def _crawl_page(self, url):
+        """抓取单个页面，静态页面走 HTTP，需要渲染时退回浏览器
+        
+        增量重爬时先发条件请求；未修改或内容哈希不变的页面不再输出
+        提取结果，沿用上次的链接继续遍历。
+        """
+        meta = await self.fetch_meta.get(url) if self.incremental else None
+        if meta is not None and url in self._sitemap_fresh:
+            self.crawl_stats['incremental']['sitemap_skipped'] += 1
+            return [], meta['links']
+        
+        if self.adaptive_rate:
+            await self.rate_limiter.acquire(url)
+        
+        proxy = None
+        if self.use_proxy:
+            proxy = self.proxy_pool.get_random(
+                urlsplit(url).netloc,
+                sticky=self.sticky_proxy,
+                exclude=self._failed_proxies.pop(url, None)
+            )
+        user_agent = self.anti_crawler.get_random_ua()
+        
+        try:
+            analysis, validators, tier = await self._fetch_page(url, meta, proxy, user_agent)
+        except RateLimited as e:
+            self.crawl_stats['throttled'] += 1
+            if self.adaptive_rate:
+                await self.rate_limiter.feedback(url, throttled=True, retry_after=e.retry_after)
+            raise
+        except Exception as e:
+            # 网络层失败计入代理健康度，重试时换一个代理
+            if proxy and classify_error(e) in SWITCH_PROXY:
+                self.proxy_pool.report(proxy, False)
+                self._failed_proxies[url] = proxy['server']
+            raise
+        # 登录等待和浏览器渲染耗时不代表代理或服务器的响应速度，只用 HTTP 请求的网络延迟
+        latency = analysis.get('latency') if tier == 'http' else None
+        self.proxy_pool.report(proxy, True, latency)
+        if self.adaptive_rate:
+            await self.rate_limiter.feedback(url, latency=latency)
+        
+        if analysis.get('not_modified'):
+            self.crawl_stats['incremental']['not_modified'] += 1
+            await self.fetch_meta.touch(url, meta)
+            return [], meta['links']
+        
+        content = analysis['content']
+        links = [link['href'] for link in analysis['links']]
+        self.crawl_stats['pages_crawled'] += 1
+        
+        if self.incremental:
+            content_hash = content_fingerprint(content)
+            await self.fetch_meta.set(url, validators, content_hash, links)
+            if meta is not None and meta['content_hash'] == content_hash:
+                self.crawl_stats['incremental']['unchanged'] += 1
+                content = []
+        
+        self.crawl_stats['elements_found'] += len(content)
+        return content, links
     
-    async def _extract_content(self, page):
-        """智能内容提取"""
-        return await page.evaluate('''() => {
-            const results = [];
+    async def _fetch_page(self, url, meta, proxy, user_agent):
+        """获取页面分析结果、响应校验值和抓取方式，优先 HTTP，必要时使用浏览器"""
+        storage_state = await self._session_state(url)
+        analysis = None
+        try_http = self._should_try_http(url)
+        conditional = meta is not None and bool(meta['etag'] or meta['last_modified'])
+        if try_http or conditional:
+            # 需要渲染的页面也先做一次条件请求，未修改时省去浏览器渲染
+            try:
+                analysis = await self.http_fetcher.fetch(
+                    url, proxy=self._http_proxy(proxy), user_agent=user_agent,
+                    validators=meta, conditional_only=not try_http,
+                    cookies=cookie_header(storage_state, url)
+                )
+            except HTTP_TIER_ERRORS as e:
+                # 连接、TLS 或超时错误不直接判定失败，交给浏览器再试一次
+                logger.debug(f'HTTP fetch failed for {url}, falling back to browser: {e!r}')
+                analysis = None
+        
+        if analysis is not None and analysis.get('not_modified'):
+            return analysis, {}, 'http'
+        
+        if analysis is not None:
+            self.crawl_stats['fetch_tiers']['http'] += 1
+            return analysis, analysis.get('validators', {}), 'http'
+        
+        async with browser_pool.new_page(
+            proxy=proxy,
+            user_agent=user_agent,
+            storage_state=storage_state,
+            viewport={'width': 1920, 'height': 1080}
+        ) as page:
+            response = await self._load_page(page, url)
+            analysis = await self._analyze_page(page)
+        self.crawl_stats['fetch_tiers']['browser'] += 1
+        validators = response_validators(response.headers) if response else {}
+        return analysis, validators, 'browser'
+    
+    async def _session_state(self, url):
+        """登录站点的页面返回共享登录态，登录态过期时只由一个 worker 重新登录"""
+        if self.sessions is None or registered_domain(url) != self._login_domain:
+            return None
+        try:
+            return await self.sessions.get_or_login(url, self._credential, self._login)
+        except LoginFailed as e:
+            # 账号无效时不再反复尝试，当前及后续页面以未登录状态抓取
+            if self.sessions is not None:
+                self.sessions = None
+                self.errors.record(self.login['url'], 'login_failed', e)
+            return None
+    
+    async def _login(self):
+        """用配置的账号登录，返回登录后的 storage_state（Cookie 和 localStorage）"""
+        username_selector = self.login.get('usernameSelector', DEFAULT_USERNAME_SELECTOR)
+        password_selector = self.login.get('passwordSelector', DEFAULT_PASSWORD_SELECTOR)
+        
+        async with browser_pool.new_page(user_agent=self.anti_crawler.get_random_ua()) as page:
+            await page.goto(self.login['url'], wait_until='domcontentloaded')
+            await page.fill(username_selector, self.login['username'])
+            await page.fill(password_selector, self.login['password'])
+            if self.login.get('submitSelector'):
+                await page.click(self.login['submitSelector'])
+            else:
+                await page.press(password_selector, 'Enter')
             
-            // 提取文本内容
-            document.querySelectorAll('p, h1, h2, h3, article').forEach(el => {
-                if (el.textContent.trim().length > 50) {
-                    results.push({
-                        type: 'text',
-                        content: el.textContent.trim(),
-                        element: el.tagName
-                    });
-                }
-            });
+            try:
+                await page.wait_for_load_state('networkidle', timeout=10000)
+            except PlaywrightTimeoutError:
+                pass
             
-            // 提取图片
-            document.querySelectorAll('img').forEach(img => {
-                if (img.naturalWidth > 100 && img.naturalHeight > 100) {
-                    results.push({
-                        type: 'image',
-                        src: img.src,
-                        alt: img.alt
-                    });
-                }
-            });
+            # 登录成功后密码框应当消失
+            password_input = await page.query_selector(password_selector)
+            if password_input is not None and await password_input.is_visible():
+                raise LoginFailed(f"Login failed on {self.login['url']}")
             
-            return results;
-        }''')
\ No newline at end of file
+            return await page.context.storage_state()
+    
+    def _should_try_http(self, url):
+        if self.render_mode == 'browser':
+            return False
+        if self.render_mode == 'http':
+            return True
+        
+        host = urlsplit(url).netloc
+        if host in self.render_hosts:
+            return False
+        # 已确认需要渲染的 host 直接使用浏览器，不再探测
+        return render_decisions.get(host) is not True
+    
+    def _http_proxy(self, proxy):
+        """将 Playwright 格式的代理转换为 aiohttp 使用的 URL"""
+        if not proxy:
+            return None
+        server = proxy['server']
+        if proxy.get('username'):
+            scheme, _, address = server.partition('://')
+            server = f"{scheme}://{proxy['username']}:{proxy.get('password', '')}@{address}"
+        return server
+    
+    async def _load_page(self, page, url):
+        """按轻量模式加载页面：拦截无用资源，DOM 就绪后有限等待网络空闲"""
+        await self.resource_blocker.attach(page)
+        response = await page.goto(url, wait_until=self.wait_until)
+        if response is not None:
+            check_response_status(url, response.status, response.headers)
+        
+        if self.wait_until != 'networkidle' and self.settle_timeout > 0:
+            try:
+                await page.wait_for_load_state('networkidle', timeout=self.settle_timeout)
+            except PlaywrightTimeoutError:
+                pass
+        return response
+    
+    async def _analyze_page(self, page):
+        """单次 evaluate 完成结构分析和内容提取"""
+        return await page.evaluate(PAGE_ANALYSIS_SCRIPT, {
+            'imagesBlocked': self.resource_blocker.blocks_images
+        })
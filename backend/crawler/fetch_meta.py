@@ -0,0 +1,75 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+
+from services.redis_client import get_async_redis, pipeline_batcher
+
+# 未变化的页面不再解析，直接沿用上次保存的链接继续遍历
+MAX_STORED_LINKS = 1000
+
+
+def content_fingerprint(content):
+    """提取结果的内容哈希，用于判断页面内容是否变化"""
+    digest = hashlib.blake2b(digest_size=16)
+    for item in content:
+        digest.update(item.get('type', '').encode())
+        digest.update((item.get('content') or item.get('src') or '').encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def parse_lastmod(value):
+    """解析 sitemap 的 lastmod（W3C Datetime），返回时间戳"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class FetchMetaStore:
+    """按任务保存每个 URL 的抓取元数据，供定时任务增量重爬
+
+    记录 ETag、Last-Modified、内容哈希、抓取时间和页面链接。
+    """
+
+    def __init__(self, task_id, redis_client=None, ttl=90 * 24 * 3600):
+        self.ttl = ttl
+        self.redis = redis_client or get_async_redis()
+        # 每个页面一次写入，与同一循环中其他协程的写入合并发送
+        self.batcher = pipeline_batcher(self.redis)
+        self.key = f'crawl:{{{task_id}}}:fetchmeta'
+
+    async def get(self, url):
+        value = await self.redis.hget(self.key, url)
+        return json.loads(value) if value else None
+
+    async def get_many(self, urls):
+        """批量读取，返回 {url: meta}"""
+        if not urls:
+            return {}
+        values = await self.redis.hmget(self.key, urls)
+        return {url: json.loads(value) for url, value in zip(urls, values) if value}
+
+    async def set(self, url, validators, content_hash, links):
+        meta = {
+            'etag': validators.get('etag'),
+            'last_modified': validators.get('last_modified'),
+            'content_hash': content_hash,
+            'crawled_at': time.time(),
+            'links': links[:MAX_STORED_LINKS]
+        }
+        await self.batcher.execute(
+            ('hset', self.key, url, json.dumps(meta)),
+            ('expire', self.key, self.ttl)
+        )
+
+    async def touch(self, url, meta):
+        """页面未变化时只更新抓取时间"""
+        meta = dict(meta, crawled_at=time.time())
+        await self.batcher.execute(('hset', self.key, url, json.dumps(meta)))
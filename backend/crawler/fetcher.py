@@ -0,0 +1,220 @@
+import asyncio
+import re
+import ssl
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from services.http_client import get_session
+from .rate_limiter import RateLimited, parse_retry_after
+from .retry import HttpStatusError
+
+# 前端框架常见的挂载点，内容为空时说明页面依赖 JS 渲染
+APP_ROOT_SELECTORS = ('#app', '#root', '#__next', '#__nuxt', 'app-root')
+
+NOSCRIPT_PATTERN = re.compile(r'enable javascript|启用\s*javascript', re.I)
+
+# 反爬挑战页通常需要执行 JS 才能通过
+ESCALATE_STATUSES = {403, 503}
+
+# HTTP 层的连接、TLS 和超时错误，抓取方遇到时改用浏览器重试
+HTTP_TIER_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ssl.SSLError)
+
+
+class RenderDecisionCache:
+    """按 host 缓存“是否需要浏览器渲染”的判断"""
+
+    def __init__(self, ttl=3600, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, host):
+        entry = self._entries.get(host)
+        if entry is None:
+            return None
+        needs_js, expires_at = entry
+        if expires_at < time.time():
+            del self._entries[host]
+            return None
+        return needs_js
+
+    def set(self, host, needs_js):
+        self._entries[host] = (needs_js, time.time() + self.ttl)
+        self._entries.move_to_end(host)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+# 进程级缓存，同一 worker 上的所有任务共享
+render_decisions = RenderDecisionCache()
+
+
+def parse_html(html, base_url):
+    """解析静态 HTML，返回与浏览器页面分析相同结构的结果"""
+    soup = BeautifulSoup(html, 'lxml')
+    content = []
+
+    for el in soup.select('p, h1, h2, h3, article'):
+        # 包含段落的 article 由内部段落表示，避免重复输出
+        if el.name == 'article' and el.find(['p', 'h1', 'h2', 'h3', 'article']):
+            continue
+        text = el.get_text().strip()
+        if len(text) > 50:
+            content.append({
+                'type': 'text',
+                'content': text,
+                'element': el.name.upper()
+            })
+
+    # 没有渲染就拿不到真实尺寸，只能依据声明的宽高，无法判断的保留
+    for img in soup.find_all('img', src=True):
+        width = _int_attr(img, 'width')
+        height = _int_attr(img, 'height')
+        if (not width and not height) or (width > 100 and height > 100):
+            content.append({
+                'type': 'image',
+                'src': urljoin(base_url, img['src']),
+                'alt': img.get('alt', '')
+            })
+
+    links = [
+        {'href': urljoin(base_url, a['href']), 'text': a.get_text().strip()}
+        for a in soup.find_all('a', href=True)
+    ]
+
+    forms = [
+        {
+            'action': urljoin(base_url, form.get('action', '')),
+            'method': form.get('method', 'get').lower(),
+            'fields': [
+                {'name': el.get('name', ''), 'type': el.get('type', el.name)}
+                for el in form.find_all(['input', 'select', 'textarea', 'button'])
+            ]
+        }
+        for form in soup.find_all('form')
+    ]
+
+    return {
+        'links': links,
+        'forms': forms,
+        'possibleLoginForm': soup.find('input', type='password') is not None,
+        'content': content,
+        'soup': soup
+    }
+
+
+def _int_attr(tag, name):
+    try:
+        return int(str(tag.get(name, '')).rstrip('px'))
+    except ValueError:
+        return 0
+
+
+def looks_like_js_shell(analysis):
+    """判断页面是否只是等待 JS 渲染的空壳"""
+    soup = analysis['soup']
+
+    for selector in APP_ROOT_SELECTORS:
+        root = soup.select_one(selector)
+        if root is not None and not root.get_text(strip=True):
+            return True
+
+    for noscript in soup.find_all('noscript'):
+        if NOSCRIPT_PATTERN.search(noscript.get_text()):
+            return True
+
+    body = soup.body
+    if body is None:
+        return True
+
+    scripts = body.find_all('script')
+    for tag in body.find_all(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+    text_length = len(body.get_text(strip=True))
+
+    return bool(scripts) and text_length < 200 and not analysis['content']
+
+
+def check_response_status(url, status, headers):
+    """429 以及带 Retry-After 的 503 视为限流，其他 5xx 作为服务器错误抛出
+
+    不带 Retry-After 的 503 多为反爬挑战页，交给调用方处理。
+    """
+    retry_after = headers.get('retry-after')
+    if status == 429 or (status == 503 and retry_after):
+        raise RateLimited(url, status, parse_retry_after(retry_after))
+    if status >= 500 and status != 503:
+        raise HttpStatusError(url, status)
+
+
+def response_validators(headers):
+    """从响应头中取出用于条件请求的校验值"""
+    return {
+        'etag': headers.get('etag'),
+        'last_modified': headers.get('last-modified')
+    }
+
+
+class HttpFetcher:
+    """静态页面抓取：用共享 aiohttp 会话获取并解析 HTML"""
+
+    async def fetch(self, url, proxy=None, user_agent=None, validators=None,
+                    conditional_only=False, cookies=None):
+        """返回页面分析结果；需要浏览器渲染时返回 None
+
+        传入上次的 validators 时发送条件请求，页面未修改（304）时返回
+        {'not_modified': True}。conditional_only 表示只做条件检查，
+        页面有变化时交给浏览器处理。cookies 为登录态对应的 Cookie 请求头。
+        """
+        headers = {'User-Agent': user_agent} if user_agent else {}
+        if cookies:
+            headers['Cookie'] = cookies
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        session = await get_session()
+
+        # latency 只统计网络往返（含读取响应体），不含解析，供代理评分和限速使用
+        started = time.monotonic()
+        async with session.get(url, headers=headers, proxy=proxy,
+                               allow_redirects=True) as response:
+            if response.status == 304:
+                return {'not_modified': True, 'latency': time.monotonic() - started}
+
+            check_response_status(url, response.status, response.headers)
+
+            if conditional_only or response.status in ESCALATE_STATUSES:
+                return None
+
+            content_type = response.headers.get('content-type', '')
+            if 'html' not in content_type:
+                return {
+                    'links': [], 'forms': [], 'possibleLoginForm': False, 'content': [],
+                    'validators': response_validators(response.headers),
+                    'latency': time.monotonic() - started
+                }
+
+            html = await response.text(errors='replace')
+            latency = time.monotonic() - started
+            base_url = str(response.url)
+            validators = response_validators(response.headers)
+
+        # 大页面的解析较慢，放到线程中避免阻塞事件循环
+        analysis = await asyncio.to_thread(parse_html, html, base_url)
+        host = urlsplit(url).netloc
+
+        if looks_like_js_shell(analysis):
+            render_decisions.set(host, True)
+            return None
+
+        render_decisions.set(host, False)
+        del analysis['soup']
+        analysis['validators'] = validators
+        analysis['latency'] = latency
+        return analysis
@@ -0,0 +1,222 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """规范化 URL 用于去重，非 http(s) 链接返回 None"""
+    try:
+        parts = urlsplit(url.strip())
+    except (AttributeError, ValueError):
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f'{host}:{port}'
+
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    # 丢弃锚点
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def url_host(url):
+    return urlsplit(url).netloc
+
+
+class UrlFrontier:
+    """广度优先的 URL 调度队列
+
+    按规范化 URL 去重；每个 host 一条独立队列，同一 host 同时最多发出
+    host_concurrency 个请求，且相邻两次请求的发出时间至少间隔 delay 秒。
+    """
+
+    def __init__(self, max_depth=2, delay=1.0, host_concurrency=4):
+        self.max_depth = max_depth
+        self.delay = delay
+        self.host_concurrency = max(1, host_concurrency)
+
+        self._seen = set()
+        # 上次断点之后新见到的 URL，断点只增量保存这一部分
+        self._new_seen = []
+        self._hosts = {}
+        self._ready = []
+        self._scheduled = set()
+        self._active = {}
+        self._next_allowed = {}
+        self._host_delays = {}
+        self._in_flight = 0
+        self._leased = {}
+        self._delayed = []
+        self._failures = {}
+        self._counter = itertools.count()
+        self._cond = asyncio.Condition()
+
+    def __len__(self):
+        return sum(len(q) for q in self._hosts.values())
+
+    @property
+    def seen_count(self):
+        return len(self._seen)
+
+    def _schedule_host(self, host):
+        queue = self._hosts.get(host)
+        if not queue or host in self._scheduled:
+            return
+        if self._active.get(host, 0) >= self.host_concurrency:
+            return
+        ready_at = self._next_allowed.get(host, 0)
+        # 同一时刻就绪的 host 优先调度队首深度更浅的
+        heapq.heappush(self._ready, (ready_at, queue[0][1], next(self._counter), host))
+        self._scheduled.add(host)
+
+    async def put(self, url, depth=0):
+        """加入待爬 URL，已见过或超出深度的忽略，返回是否入队"""
+        if depth > self.max_depth:
+            return False
+
+        normalized = normalize_url(url)
+        if normalized is None:
+            return False
+
+        async with self._cond:
+            if normalized in self._seen:
+                return False
+            self._seen.add(normalized)
+            self._new_seen.append(normalized)
+            host = url_host(normalized)
+            self._hosts.setdefault(host, deque()).append((normalized, depth))
+            self._schedule_host(host)
+            self._cond.notify()
+        return True
+
+    def _promote_delayed(self, now):
+        """把到期的重试 URL 放回所属 host 队列的队首"""
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, url, depth = heapq.heappop(self._delayed)
+            host = url_host(url)
+            self._hosts.setdefault(host, deque()).appendleft((url, depth))
+            self._schedule_host(host)
+
+    async def get(self):
+        """取出下一个可以抓取的 (url, depth)，队列耗尽时返回 None"""
+        async with self._cond:
+            while True:
+                now = time.monotonic()
+                self._promote_delayed(now)
+
+                wait = None
+                if self._ready:
+                    wait = self._ready[0][0] - now
+                    if wait <= 0:
+                        break
+                elif self._in_flight == 0 and not self._delayed:
+                    # 没有待爬 URL，也不会再有新链接产生
+                    self._cond.notify_all()
+                    return None
+
+                if self._delayed:
+                    retry_wait = self._delayed[0][0] - now
+                    wait = retry_wait if wait is None else min(wait, retry_wait)
+
+                if wait is None:
+                    await self._cond.wait()
+                    continue
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            _, _, _, host = heapq.heappop(self._ready)
+            self._scheduled.discard(host)
+            self._active[host] = self._active.get(host, 0) + 1
+            self._next_allowed[host] = now + self._host_delays.get(host, self.delay)
+            url, depth = self._hosts[host].popleft()
+            if not self._hosts[host]:
+                del self._hosts[host]
+            # 未达到并发上限时，该 host 的下一个 URL 在间隔之后即可发出
+            self._schedule_host(host)
+            self._in_flight += 1
+            self._leased[url] = depth
+            return url, depth
+
+    def _release_host(self, url):
+        """结束 url 的租约，归还所属 host 的并发名额"""
+        host = url_host(url)
+        self._in_flight -= 1
+        self._leased.pop(url, None)
+        active = self._active.get(host, 0) - 1
+        if active > 0:
+            self._active[host] = active
+        else:
+            self._active.pop(host, None)
+        return host
+
+    async def done(self, url):
+        """标记 URL 抓取结束，归还该 host 的并发名额"""
+        async with self._cond:
+            host = self._release_host(url)
+            self._schedule_host(host)
+            self._cond.notify_all()
+
+    async def set_host_delay(self, host, delay):
+        """为单个 host 设置更长的请求间隔（如 robots.txt 的 Crawl-delay）"""
+        self._host_delays[host] = max(self.delay, delay)
+
+    async def release(self, url, depth):
+        """放回未完成的 URL（任务被暂停或中断时）"""
+        async with self._cond:
+            host = self._release_host(url)
+            self._hosts.setdefault(host, deque()).appendleft((url, depth))
+            self._schedule_host(host)
+            self._cond.notify_all()
+
+    async def count_failure(self, url):
+        """记录一次抓取失败，返回该 URL 累计失败次数"""
+        self._failures[url] = self._failures.get(url, 0) + 1
+        return self._failures[url]
+
+    async def retry(self, url, depth, delay):
+        """释放租约，delay 秒后重新放回队列；等待期间不占用 worker"""
+        async with self._cond:
+            host = self._release_host(url)
+            self._schedule_host(host)
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._counter), url, depth))
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """导出待爬 URL（含抓取中和等待重试的）和上次断点后新见到的 URL，用于断点续爬
+
+        seen-set 只导出增量，保存成功后调用 mark_seen_saved 丢弃已保存的部分。
+        """
+        pending = list(self._leased.items())
+        pending.extend((url, depth) for _, _, url, depth in self._delayed)
+        for queue in self._hosts.values():
+            pending.extend(queue)
+        return {'pending': pending, 'new_seen': self._new_seen[:]}
+
+    def mark_seen_saved(self, count):
+        """snapshot 导出的前 count 个新 URL 已写入断点"""
+        del self._new_seen[:count]
+
+    def restore(self, snapshot):
+        """从快照恢复队列（seen 为完整的 seen-set），需在开始抓取前调用"""
+        self._seen = set(snapshot['seen'])
+        self._new_seen = []
+        for url, depth in snapshot['pending']:
+            host = url_host(url)
+            self._hosts.setdefault(host, deque()).append((url, depth))
+            self._schedule_host(host)
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from prometheus_client import Counter
+
+from services.http_client import get_session, limited
+from services.redis_client import get_async_redis
+from .browser_pool import browser_pool
+from .fetcher import looks_like_js_shell, parse_html
+
+LOGIN_DETECTIONS = Counter(
+    'crawler_login_detections_total',
+    'Login requirement checks by method',
+    ['method']
+)
+
+VERDICT_KEY = 'login:verdict:{}'
+
+# 跳转到这些路径通常意味着需要登录
+LOGIN_PATH = re.compile(
+    r'/(login|log-in|signin|sign-in|sign_in|logon|auth|sso|passport|users/sign_in)(/|$|\?|\.)',
+    re.I
+)
+
+# 路径中的数字、UUID、哈希等 ID 段归并为 *
+ID_SEGMENT = re.compile(r'^(\d+|[0-9a-f]{16,}|[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12})$', re.I)
+
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=5)
+MAX_PROBE_BYTES = 512 * 1024
+
+
+def url_pattern(url):
+    """同一类页面（只有 ID 不同）共用一个判定结果"""
+    parts = urlsplit(url)
+    segments = ['*' if ID_SEGMENT.match(segment) else segment for segment in parts.path.split('/')]
+    return f"{parts.netloc.lower()}{'/'.join(segments) or '/'}"
+
+
+def _verdict(requires_login, reason, method):
+    return {'requiresLogin': requires_login, 'reason': reason, 'method': method}
+
+
+class LoginDetector:
+    """登录需求检测
+
+    先用普通 HTTP 请求判断（401、跳转到登录页、页面中有密码框、已有正文），
+    无法判断时（JS 渲染的页面等）才使用浏览器池。结果按 URL 模式缓存。
+    """
+
+    def __init__(self, ttl=6 * 3600):
+        self.ttl = ttl
+
+    def _key(self, url):
+        return VERDICT_KEY.format(hashlib.sha1(url_pattern(url).encode()).hexdigest())
+
+    async def cached(self, url):
+        value = await get_async_redis().get(self._key(url))
+        if value is None:
+            return None
+        LOGIN_DETECTIONS.labels('cache').inc()
+        return dict(json.loads(value), cached=True)
+
+    async def detect(self, url, allow_browser=True):
+        """返回判定结果；allow_browser 为 False 且 HTTP 无法判断时返回 None"""
+        verdict = await self.cached(url)
+        if verdict is not None:
+            return verdict
+
+        verdict = await self.probe(url)
+        if verdict is None:
+            if not allow_browser:
+                return None
+            verdict = await self.detect_with_browser(url)
+
+        LOGIN_DETECTIONS.labels(verdict['method']).inc()
+        value = dict(verdict, pattern=url_pattern(url), checked_at=int(time.time()))
+        await get_async_redis().set(self._key(url), json.dumps(value), ex=self.ttl)
+        return value
+
+    async def probe(self, url):
+        """HTTP 快速判断，无法确定时返回 None"""
+        session = await get_session()
+        try:
+            async with limited():
+                async with session.get(url, allow_redirects=True, timeout=PROBE_TIMEOUT) as response:
+                    if response.status == 401:
+                        return _verdict(True, 'http_401', 'http')
+                    if LOGIN_PATH.search(str(response.url)) and not LOGIN_PATH.search(url):
+                        return _verdict(True, 'redirect_to_login', 'http')
+                    if response.status >= 400 or 'html' not in response.headers.get('content-type', ''):
+                        return None
+                    body = await response.content.read(MAX_PROBE_BYTES)
+                    base_url = str(response.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+        # 解析是 CPU 密集操作，放到线程里避免阻塞事件循环
+        analysis = await asyncio.to_thread(parse_html, body.decode('utf-8', errors='replace'), base_url)
+        if analysis['possibleLoginForm']:
+            return _verdict(True, 'password_form', 'http')
+        if looks_like_js_shell(analysis):
+            return None
+        return _verdict(False, 'content', 'http')
+
+    async def detect_with_browser(self, url):
+        """渲染页面后检查密码输入框和最终地址"""
+        async with browser_pool.new_page() as page:
+            await page.goto(url, wait_until='domcontentloaded')
+            try:
+                await page.wait_for_load_state('networkidle', timeout=3000)
+            except PlaywrightTimeoutError:
+                pass
+            if LOGIN_PATH.search(page.url) and not LOGIN_PATH.search(url):
+                return _verdict(True, 'redirect_to_login', 'browser')
+            if await page.query_selector('input[type="password"]') is not None:
+                return _verdict(True, 'password_form', 'browser')
+        return _verdict(False, 'content', 'browser')
+
+
+login_detector = LoginDetector()
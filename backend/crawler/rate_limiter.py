@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import tldextract
+from prometheus_client import Counter
+
+from services.redis_client import get_async_redis
+
+RATE_LIMIT_EVENTS = Counter(
+    'crawler_rate_limit_events_total',
+    'Adaptive rate limiter events',
+    ['event']
+)
+
+# 只使用内置的公共后缀列表，运行时不联网更新
+_extract = tldextract.TLDExtract(suffix_list_urls=())
+
+# 令牌桶：按 Redis 服务器时间补充令牌，拿不到令牌时返回需要等待的毫秒数
+ACQUIRE_SCRIPT = '''
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate', 'blocked_until')
+local rate = tonumber(state[3]) or tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local blocked_until = tonumber(state[4]) or 0
+
+if blocked_until > now then
+    return blocked_until - now
+end
+
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return wait
+'''
+
+# AIMD：正常响应加性提速，限流或延迟飙升时乘性降速（冷却期内只降一次）
+FEEDBACK_SCRIPT = '''
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'rate', 'latency', 'decreased_at')
+local rate = tonumber(state[1]) or tonumber(ARGV[4])
+local latency = tonumber(state[2])
+local decreased_at = tonumber(state[3]) or 0
+local min_rate = tonumber(ARGV[5])
+local max_rate = tonumber(ARGV[6])
+local cooldown = tonumber(ARGV[9])
+
+local function decrease(factor)
+    if now - decreased_at >= cooldown then
+        rate = math.max(min_rate, rate * factor)
+        redis.call('HSET', KEYS[1], 'decreased_at', now)
+    end
+end
+
+if ARGV[1] == 'throttled' then
+    decrease(tonumber(ARGV[8]))
+    local retry_after = tonumber(ARGV[3])
+    if retry_after > 0 then
+        redis.call('HSET', KEYS[1], 'blocked_until', now + retry_after)
+    end
+else
+    local sample = tonumber(ARGV[2])
+    if sample >= 0 then
+        if latency and sample > latency * 2 and sample > 1000 then
+            decrease(0.8)
+        else
+            rate = math.min(max_rate, rate + tonumber(ARGV[7]))
+        end
+        if latency then
+            latency = latency * 0.8 + sample * 0.2
+        else
+            latency = sample
+        end
+        redis.call('HSET', KEYS[1], 'latency', latency)
+    else
+        rate = math.min(max_rate, rate + tonumber(ARGV[7]))
+    end
+end
+
+redis.call('HSET', KEYS[1], 'rate', rate)
+redis.call('PEXPIRE', KEYS[1], ARGV[10])
+return tostring(rate)
+'''
+
+
+def registered_domain(url):
+    """按注册域名（example.co.uk）归并子域名，IP 和内网主机名原样返回"""
+    host = urlsplit(url).hostname or ''
+    return _extract(host).registered_domain or host
+
+
+def parse_retry_after(value, limit=3600):
+    """解析 Retry-After（秒数或 HTTP 日期），返回秒数"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), limit)
+
+
+def capped_rate(max_rate, delay):
+    """配置了请求间隔时，速率上限不超过 1/delay"""
+    if delay and delay > 0:
+        return min(max_rate, 1 / delay)
+    return max_rate
+
+
+class RateLimited(Exception):
+    """站点返回了限流响应（429，或带 Retry-After 的 503）"""
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f'{url} returned {status} (retry after {retry_after}s)')
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+class DomainRateLimiter:
+    """按注册域名的自适应令牌桶限速，通过 Redis 在协程和 worker 之间共享
+
+    正常响应时每次加性提高速率，直到 max_rate（调用方应按 delay 限制上限）；遇到 429/503 时速率减半，
+    并在 Retry-After 期间暂停该域名；延迟明显升高时小幅降速。
+    """
+
+    def __init__(self, redis_client=None, rate=1.0, max_rate=4.0, min_rate=1 / 60,
+                 burst=2, increase=0.05, decrease=0.5, cooldown=2.0, ttl=24 * 3600):
+        self.redis = redis_client or get_async_redis()
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown_ms = int(cooldown * 1000)
+        self.ttl_ms = int(ttl * 1000)
+
+        self._acquire = self.redis.register_script(ACQUIRE_SCRIPT)
+        self._feedback = self.redis.register_script(FEEDBACK_SCRIPT)
+
+    def _key(self, url):
+        return f'ratelimit:{registered_domain(url)}'
+
+    async def acquire(self, url):
+        """等待直到该域名有可用令牌"""
+        key = self._key(url)
+        waited = False
+        while True:
+            wait = await self._acquire(keys=[key], args=[self.rate, self.burst, self.ttl_ms])
+            if not wait:
+                if waited:
+                    RATE_LIMIT_EVENTS.labels('delayed').inc()
+                return
+            waited = True
+            await asyncio.sleep(int(wait) / 1000)
+
+    async def feedback(self, url, latency=None, throttled=False, retry_after=None):
+        """根据响应调整该域名的速率，返回新的速率（次/秒）"""
+        RATE_LIMIT_EVENTS.labels('throttled' if throttled else 'ok').inc()
+        rate = await self._feedback(
+            keys=[self._key(url)],
+            args=[
+                'throttled' if throttled else 'ok',
+                int(latency * 1000) if latency is not None else -1,
+                int((retry_after or 0) * 1000),
+                self.rate, self.min_rate, self.max_rate,
+                self.increase, self.decrease,
+                self.cooldown_ms, self.ttl_ms
+            ]
+        )
+        return float(rate)
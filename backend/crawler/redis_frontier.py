@@ -0,0 +1,220 @@
+import asyncio
+import time
+from services.redis_client import get_async_redis, pipeline_batcher
+from .frontier import normalize_url, url_host
+
+# 入队：全局 seen-set 去重，按深度排序保证广度优先
+PUT_SCRIPT = """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+local seq = redis.call('INCR', KEYS[4])
+redis.call('ZADD', KEYS[2], tonumber(ARGV[2]) * 1e12 + seq, ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], tonumber(ARGV[3]))
+end
+return 1
+"""
+
+# 领取：回收过期租约和到期的重试，再从队首挑选第一个 host 已到达间隔、
+# 且进行中的请求数未达上限的 URL
+CLAIM_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local limit = tonumber(ARGV[5])
+
+for _, key in ipairs({KEYS[2], KEYS[6]}) do
+    local due = redis.call('ZRANGEBYSCORE', key, '-inf', now)
+    for _, url in ipairs(due) do
+        redis.call('ZREM', key, url)
+        if key == KEYS[2] then
+            -- 租约过期（worker 崩溃）时归还 host 的并发名额
+            local host = string.match(url, '^%a+://([^/]+)')
+            if redis.call('HINCRBY', KEYS[7], host, -1) <= 0 then
+                redis.call('HDEL', KEYS[7], host)
+            end
+        end
+        local depth = tonumber(redis.call('HGET', KEYS[3], url) or '0')
+        redis.call('ZADD', KEYS[1], depth * 1e12, url)
+    end
+end
+
+local candidates = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[3]) - 1)
+local wait = -1
+for _, url in ipairs(candidates) do
+    local host = string.match(url, '^%a+://([^/]+)')
+    local next_at = tonumber(redis.call('HGET', KEYS[4], host) or '0')
+    local active = tonumber(redis.call('HGET', KEYS[7], host) or '0')
+    if next_at <= now and active < limit then
+        redis.call('ZREM', KEYS[1], url)
+        redis.call('ZADD', KEYS[2], now + tonumber(ARGV[1]), url)
+        local delay = tonumber(redis.call('HGET', KEYS[5], host) or ARGV[2])
+        redis.call('HSET', KEYS[4], host, now + delay)
+        redis.call('EXPIRE', KEYS[4], tonumber(ARGV[4]))
+        redis.call('HINCRBY', KEYS[7], host, 1)
+        redis.call('EXPIRE', KEYS[7], tonumber(ARGV[4]))
+        return {url, redis.call('HGET', KEYS[3], url) or '0'}
+    end
+    -- 并发已满的 host 要等其他请求完成，稍后再查
+    local host_wait = active < limit and next_at - now or 100
+    if wait < 0 or host_wait < wait then
+        wait = host_wait
+    end
+end
+
+if #candidates == 0 then
+    local retry = redis.call('ZRANGE', KEYS[6], 0, 0, 'WITHSCORES')
+    if redis.call('ZCARD', KEYS[2]) == 0 and #retry == 0 then
+        return {'', 'done'}
+    end
+    wait = 500
+    if #retry > 0 then
+        wait = math.min(wait, tonumber(retry[2]) - now)
+    end
+end
+return {'', tostring(wait)}
+"""
+
+# 结束租约：仍持有租约时才归还 host 的并发名额（过期的租约已由 CLAIM 回收）；
+# ARGV[3] 为 done、release 或 retry，后两者把 URL 按 ARGV[4] 的分数放回队列或重试队列
+FINISH_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    if redis.call('HINCRBY', KEYS[3], ARGV[2], -1) <= 0 then
+        redis.call('HDEL', KEYS[3], ARGV[2])
+    end
+end
+if ARGV[3] == 'done' then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    return 1
+end
+local target = ARGV[3] == 'release' and KEYS[4] or KEYS[5]
+redis.call('ZADD', target, tonumber(ARGV[4]), ARGV[1])
+redis.call('EXPIRE', target, tonumber(ARGV[5]))
+return 1
+"""
+
+
+class RedisFrontier:
+    """多个 Celery worker 共享的 Redis 调度队列
+
+    接口与 UrlFrontier 一致。URL 通过 Lua 脚本原子领取并加租约，
+    租约过期（worker 崩溃）的 URL 会被重新放回队列；seen-set、每个 host
+    的请求间隔和并发上限在所有 worker 之间全局生效。
+    """
+
+    def __init__(self, job_id, max_depth=2, delay=1.0, host_concurrency=4, redis_client=None,
+                 lease_seconds=120, scan_limit=50, ttl=7 * 24 * 3600):
+        self.job_id = job_id
+        self.max_depth = max_depth
+        self.delay = delay
+        self.host_concurrency = max(1, host_concurrency)
+        self.lease_ms = int(lease_seconds * 1000)
+        self.scan_limit = scan_limit
+        self.ttl = ttl
+        self.redis = redis_client or get_async_redis()
+        self.batcher = pipeline_batcher(self.redis)
+
+        # 使用 hash tag 让同一任务的键落在同一个集群槽位
+        prefix = f'crawl:{{{job_id}}}'
+        self.seen_key = f'{prefix}:seen'
+        self.queue_key = f'{prefix}:queue'
+        self.leases_key = f'{prefix}:leases'
+        self.depth_key = f'{prefix}:depth'
+        self.seq_key = f'{prefix}:seq'
+        self.hosts_key = f'{prefix}:hosts'
+        self.delays_key = f'{prefix}:delays'
+        self.retry_key = f'{prefix}:retry'
+        self.failures_key = f'{prefix}:failures'
+        self.active_key = f'{prefix}:active'
+
+        self._put = self.redis.register_script(PUT_SCRIPT)
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+        self._finish = self.redis.register_script(FINISH_SCRIPT)
+
+    async def put(self, url, depth=0):
+        """加入待爬 URL，已见过或超出深度的忽略，返回是否入队"""
+        if depth > self.max_depth:
+            return False
+
+        normalized = normalize_url(url)
+        if normalized is None:
+            return False
+
+        added = await self._put(
+            keys=[self.seen_key, self.queue_key, self.depth_key, self.seq_key],
+            args=[normalized, depth, self.ttl]
+        )
+        return bool(added)
+
+    async def get(self):
+        """领取下一个可以抓取的 (url, depth)，全部完成时返回 None"""
+        while True:
+            url, value = await self._claim(
+                keys=[self.queue_key, self.leases_key, self.depth_key,
+                      self.hosts_key, self.delays_key, self.retry_key, self.active_key],
+                args=[self.lease_ms, int(self.delay * 1000), self.scan_limit, self.ttl,
+                      self.host_concurrency]
+            )
+            if url:
+                return url, int(value)
+
+            if value == 'done':
+                # 队列为空且没有其他 worker 持有租约
+                return None
+
+            # host 间隔未到，或其他 worker 仍在抓取、可能还会产生新链接
+            await asyncio.sleep(min(max(float(value), 50), 1000) / 1000)
+
+    def _finish_args(self, url, action, score=0):
+        keys = [self.leases_key, self.depth_key, self.active_key, self.queue_key, self.retry_key]
+        return keys, [url, url_host(url), action, score, self.ttl]
+
+    async def done(self, url):
+        """释放租约，多个协程的释放合并为一次往返"""
+        keys, args = self._finish_args(url, 'done')
+        await self.batcher.execute(('eval', FINISH_SCRIPT, len(keys), *keys, *args))
+
+    async def set_host_delay(self, host, delay):
+        """为单个 host 设置更长的请求间隔，所有 worker 共同遵守"""
+        delay_ms = int(max(self.delay, delay) * 1000)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self.delays_key, host, delay_ms)
+            pipe.expire(self.delays_key, self.ttl)
+            await pipe.execute()
+
+    async def release(self, url, depth):
+        """放回未完成的 URL，让其他 worker 立即可以领取"""
+        keys, args = self._finish_args(url, 'release', depth * 1e12)
+        await self._finish(keys=keys, args=args)
+
+    async def count_failure(self, url):
+        """记录一次抓取失败，返回所有 worker 上该 URL 的累计失败次数"""
+        failures, _ = await self.batcher.execute(
+            ('hincrby', self.failures_key, url, 1),
+            ('expire', self.failures_key, self.ttl)
+        )
+        return failures
+
+    async def retry(self, url, depth, delay):
+        """释放租约，delay 秒后由任意 worker 重新领取"""
+        retry_at = int((time.time() + delay) * 1000)
+        keys, args = self._finish_args(url, 'retry', retry_at)
+        await self._finish(keys=keys, args=args)
+
+    def snapshot(self):
+        # 队列本身就保存在 Redis 中，无需额外快照
+        return None
+
+    def restore(self, snapshot):
+        pass
+
+    async def count_seen(self):
+        return await self.redis.scard(self.seen_key)
+
+    async def clear(self):
+        """任务完成或取消后删除调度队列和 seen-set，同一任务再次运行时从头抓取"""
+        await self.redis.delete(
+            self.seen_key, self.queue_key, self.leases_key, self.depth_key, self.seq_key,
+            self.hosts_key, self.delays_key, self.retry_key, self.failures_key, self.active_key
+        )
@@ -0,0 +1,142 @@
+import asyncio
+import random
+import socket
+
+import aiohttp
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from prometheus_client import Counter
+
+from .rate_limiter import RateLimited
+from .session_store import LoginLockTimeout
+
+FETCH_ERRORS = Counter(
+    'crawler_fetch_errors_total',
+    'Page fetch failures by error class',
+    ['error_class']
+)
+
+FETCH_RETRIES = Counter(
+    'crawler_fetch_retries_total',
+    'Page fetch retries scheduled by error class',
+    ['error_class']
+)
+
+# 可能是暂时性故障、值得重试的错误类别
+RETRYABLE = {
+    'timeout', 'connection', 'proxy', 'http_5xx', 'rate_limited',
+    'navigation_aborted', 'browser_crashed', 'login_wait'
+}
+
+# 重试时应换一个代理的错误类别
+SWITCH_PROXY = {'timeout', 'connection', 'proxy'}
+
+# Chromium 网络错误码到错误类别的映射，按顺序匹配
+PLAYWRIGHT_ERRORS = (
+    ('ERR_NAME_NOT_RESOLVED', 'dns'),
+    ('ERR_NAME_RESOLUTION_FAILED', 'dns'),
+    ('ERR_PROXY', 'proxy'),
+    ('ERR_TUNNEL_CONNECTION_FAILED', 'proxy'),
+    ('ERR_TIMED_OUT', 'timeout'),
+    ('ERR_ABORTED', 'navigation_aborted'),
+    ('ERR_CERT', 'tls'),
+    ('ERR_SSL', 'tls'),
+    ('ERR_CONNECTION', 'connection'),
+    ('ERR_EMPTY_RESPONSE', 'connection'),
+    ('ERR_NETWORK_CHANGED', 'connection'),
+    ('has been closed', 'browser_crashed'),
+    ('Target closed', 'browser_crashed'),
+)
+
+
+class HttpStatusError(Exception):
+    """服务器返回 5xx 错误"""
+
+    def __init__(self, url, status):
+        super().__init__(f'{url} returned {status}')
+        self.url = url
+        self.status = status
+
+
+def classify_error(error):
+    """把抓取异常归类为 dns、timeout、http_5xx、proxy 等错误类别"""
+    if isinstance(error, RateLimited):
+        return 'rate_limited'
+    if isinstance(error, LoginLockTimeout):
+        # 等待登录锁超时与代理无关，重试时不换代理
+        return 'login_wait'
+    if isinstance(error, HttpStatusError):
+        return 'http_5xx'
+    if isinstance(error, PlaywrightTimeoutError):
+        return 'timeout'
+    if isinstance(error, PlaywrightError):
+        message = str(error)
+        for marker, error_class in PLAYWRIGHT_ERRORS:
+            if marker in message:
+                return error_class
+        return 'browser'
+    if isinstance(error, (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError)):
+        return 'proxy'
+    if isinstance(error, (aiohttp.ClientConnectorCertificateError, aiohttp.ClientSSLError)):
+        return 'tls'
+    if isinstance(error, aiohttp.ClientConnectorError):
+        if isinstance(error.os_error, socket.gaierror):
+            return 'dns'
+        return 'connection'
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(error, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError,
+                          aiohttp.ClientPayloadError)):
+        return 'connection'
+    if isinstance(error, aiohttp.ClientResponseError):
+        return 'http_5xx' if error.status >= 500 else 'http_4xx'
+    if isinstance(error, aiohttp.ClientError):
+        return 'connection'
+    return 'other'
+
+
+class RetryPolicy:
+    """带抖动的指数退避重试策略"""
+
+    def __init__(self, max_retries=3, base_delay=2.0, max_delay=120.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, error_class, attempt):
+        return error_class in RETRYABLE and attempt <= self.max_retries
+
+    def backoff(self, attempt, retry_after=None):
+        """第 attempt 次重试前的等待秒数：上限的一半固定，另一半随机"""
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = cap / 2 + random.uniform(0, cap / 2)
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class ErrorStats:
+    """按错误类别聚合失败次数，只保留最近少量样例"""
+
+    def __init__(self, sample_size=20):
+        self.sample_size = sample_size
+        self.stats = {'total': 0, 'retried': 0, 'by_class': {}, 'samples': []}
+
+    def record(self, url, error_class, error):
+        FETCH_ERRORS.labels(error_class).inc()
+        self.stats['total'] += 1
+        self.stats['by_class'][error_class] = self.stats['by_class'].get(error_class, 0) + 1
+
+        samples = self.stats['samples']
+        samples.append({'url': url, 'class': error_class, 'error': str(error)[:500]})
+        if len(samples) > self.sample_size:
+            del samples[0]
+
+    def record_retry(self, error_class):
+        FETCH_RETRIES.labels(error_class).inc()
+        self.stats['retried'] += 1
+
+    def restore(self, stats):
+        self.stats['total'] = stats.get('total', 0)
+        self.stats['retried'] = stats.get('retried', 0)
+        self.stats['by_class'].update(stats.get('by_class', {}))
+        self.stats['samples'].extend(stats.get('samples', [])[-self.sample_size:])
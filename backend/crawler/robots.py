@@ -0,0 +1,205 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from services.redis_client import get_async_redis
+from services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+CRAWLER_AGENT = 'happyseek'
+
+# 编译后的规则在进程内所有任务间共享
+_compiled_policies = OrderedDict()
+
+
+class _TrieNode:
+    __slots__ = ('children', 'rule')
+
+    def __init__(self):
+        self.children = {}
+        self.rule = None
+
+
+class RobotsRules:
+    """编译后的单个 user-agent 分组规则
+
+    普通前缀规则放进字符 trie，沿路径走一遍即可得到最长匹配，
+    复杂度 O(路径长度)；带 * 或 $ 的规则单独编译成正则。
+    最长匹配优先，长度相同时 Allow 优先。
+    """
+
+    def __init__(self, rules, crawl_delay=None):
+        self.crawl_delay = crawl_delay
+        self._root = _TrieNode()
+        self._patterns = []
+
+        for allow, path in rules:
+            if not path:
+                # 空的 Disallow 表示允许全部
+                continue
+            if '*' in path or path.endswith('$'):
+                self._patterns.append((len(path), allow, self._compile(path)))
+            else:
+                self._insert(path, allow)
+
+    @staticmethod
+    def _compile(path):
+        anchored = path.endswith('$')
+        if anchored:
+            path = path[:-1]
+        pattern = '.*'.join(re.escape(part) for part in path.split('*'))
+        return re.compile(pattern + ('$' if anchored else ''))
+
+    def _insert(self, path, allow):
+        node = self._root
+        for char in path:
+            node = node.children.setdefault(char, _TrieNode())
+        rule = (len(path), allow)
+        if node.rule is None or (allow and not node.rule[1]):
+            node.rule = rule
+
+    def allowed(self, path):
+        best = None
+        node = self._root
+        for char in path:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.rule is not None:
+                best = node.rule
+
+        for length, allow, regex in self._patterns:
+            if regex.match(path):
+                if best is None or length > best[0] or (length == best[0] and allow):
+                    best = (length, allow)
+
+        return True if best is None else best[1]
+
+
+class RobotsPolicy:
+    """解析后的 robots.txt，按 user-agent 选择规则组"""
+
+    def __init__(self, groups):
+        self._groups = groups
+
+    @classmethod
+    def parse(cls, content):
+        groups = {}
+        agents = []
+        in_rules = False
+
+        for raw in content.splitlines():
+            line = raw.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = line.split(':', 1)
+            # 指令名和 user-agent 不区分大小写，路径区分大小写
+            field = field.strip().lower()
+            value = value.strip()
+
+            if field == 'user-agent':
+                if in_rules:
+                    agents = []
+                    in_rules = False
+                agent = value.lower()
+                agents.append(agent)
+                groups.setdefault(agent, {'rules': [], 'crawl_delay': None})
+            elif field in ('allow', 'disallow'):
+                in_rules = True
+                for agent in agents:
+                    groups[agent]['rules'].append((field == 'allow', value))
+            elif field == 'crawl-delay':
+                in_rules = True
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    groups[agent]['crawl_delay'] = delay
+
+        return cls({
+            agent: RobotsRules(group['rules'], group['crawl_delay'])
+            for agent, group in groups.items()
+        })
+
+    def rules_for(self, agent=CRAWLER_AGENT):
+        agent = agent.lower()
+        for name, rules in self._groups.items():
+            if name != '*' and name in agent:
+                return rules
+        return self._groups.get('*')
+
+    def can_fetch(self, url, agent=CRAWLER_AGENT):
+        rules = self.rules_for(agent)
+        if rules is None:
+            return True
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        return rules.allowed(path)
+
+    def crawl_delay(self, agent=CRAWLER_AGENT):
+        rules = self.rules_for(agent)
+        return rules.crawl_delay if rules else None
+
+    def to_dict(self):
+        return {
+            agent: {'crawl_delay': rules.crawl_delay}
+            for agent, rules in self._groups.items()
+        }
+
+
+class RobotsCache:
+    """robots.txt 缓存：原文按 host 存 Redis（带 TTL），编译结果放进程内 LRU"""
+
+    def __init__(self, redis_client=None, ttl=3600, error_ttl=300, max_local=1000):
+        self.redis = redis_client or get_async_redis()
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_local = max_local
+        self._local = _compiled_policies
+
+    async def get_policy(self, url):
+        parts = urlsplit(url)
+        origin = f'{parts.scheme}://{parts.netloc}'
+
+        cached = self._local.get(origin)
+        if cached is not None and cached[1] > time.time():
+            self._local.move_to_end(origin)
+            return cached[0]
+
+        key = f'robots:{origin}'
+        content = await self.redis.get(key)
+        ttl = self.ttl
+        if content is None:
+            content, ttl = await self._fetch(origin)
+            await self.redis.set(key, content, ex=ttl)
+
+        policy = RobotsPolicy.parse(content)
+        self._local[origin] = (policy, time.time() + ttl)
+        self._local.move_to_end(origin)
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+        return policy
+
+    async def _fetch(self, origin):
+        """获取 robots.txt；不存在时视为全部允许，请求失败时短期缓存"""
+        try:
+            session = await get_session()
+            async with session.get(f'{origin}/robots.txt', timeout=10) as response:
+                if response.status == 200:
+                    return await response.text(errors='replace'), self.ttl
+                if response.status < 500:
+                    return '', self.ttl
+                return '', self.error_ttl
+        except Exception as e:
+            logger.warning(f'Failed to fetch robots.txt for {origin}: {e}')
+            return '', self.error_ttl
+
+    async def can_fetch(self, url, agent=CRAWLER_AGENT):
+        policy = await self.get_policy(url)
+        return policy.can_fetch(url, agent)
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from config import Config
+from services.redis_client import get_async_redis
+from .rate_limiter import registered_domain
+
+logger = logging.getLogger(__name__)
+
+# 只有持有者才能释放锁
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# 任务配置中需要加密保存的登录字段
+SECRET_LOGIN_FIELDS = ('username', 'password')
+
+
+class LoginFailed(Exception):
+    """使用配置的账号登录失败"""
+
+
+class LoginLockTimeout(Exception):
+    """等待其他 worker 完成登录超时"""
+
+
+def _fernet():
+    key = Config.SESSION_ENCRYPTION_KEY
+    if not key:
+        # 未单独配置时由 SECRET_KEY 派生
+        key = base64.urlsafe_b64encode(hashlib.sha256(Config.SECRET_KEY.encode()).digest())
+    return Fernet(key)
+
+
+def seal_login(login):
+    """加密登录配置中的账号密码，只保留登录地址和选择器等明文字段
+
+    结果可以写入任务配置和 Celery 消息，由 open_login 在 worker 中解密。
+    """
+    sealed = {name: value for name, value in login.items() if name not in SECRET_LOGIN_FIELDS}
+    secret = {name: login.get(name) for name in SECRET_LOGIN_FIELDS}
+    sealed['credentials'] = _fernet().encrypt(json.dumps(secret).encode()).decode()
+    return sealed
+
+
+def open_login(login):
+    """解密 seal_login 的结果；密钥更换导致无法解密时返回 None"""
+    if not login or 'credentials' not in login:
+        return login or None
+    try:
+        secret = json.loads(_fernet().decrypt(login['credentials'].encode()))
+    except InvalidToken:
+        logger.warning(f"Discarding undecryptable credentials for {login.get('url')}")
+        return None
+    opened = {name: value for name, value in login.items() if name != 'credentials'}
+    opened.update(secret)
+    return opened
+
+
+def credential_id(login_url, username):
+    """凭据标识，不在 Redis 键中暴露用户名"""
+    return hashlib.sha256(f'{login_url}|{username}'.encode()).hexdigest()[:16]
+
+
+def cookie_header(storage_state, url):
+    """从 storage_state 中取出适用于 url 的 Cookie 请求头，供 HTTP 抓取复用登录态"""
+    if not storage_state:
+        return None
+
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    path = parts.path or '/'
+    now = time.time()
+
+    pairs = []
+    for cookie in storage_state.get('cookies', []):
+        domain = cookie.get('domain', '').lstrip('.')
+        if host != domain and not host.endswith('.' + domain):
+            continue
+        if not path.startswith(cookie.get('path', '/')):
+            continue
+        if cookie.get('secure') and parts.scheme != 'https':
+            continue
+        expires = cookie.get('expires', -1)
+        if 0 < expires < now:
+            continue
+        pairs.append(f"{cookie['name']}={cookie['value']}")
+    return '; '.join(pairs) or None
+
+
+class SessionStore:
+    """登录态存储：按站点和凭据保存 Playwright storage_state
+
+    内容用 Fernet 加密后写入 Redis，同一站点和账号的所有任务、worker 共享；
+    过期时间取持久化 Cookie 中最早的过期时间。登录态失效时只有持有刷新锁的
+    worker 执行登录，其他 worker 等待新的登录态。
+    """
+
+    def __init__(self, redis_client=None, ttl=12 * 3600, lock_timeout=120):
+        self.redis = redis_client or get_async_redis()
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._fernet = _fernet()
+        self._release = self.redis.register_script(RELEASE_LOCK_SCRIPT)
+
+    def _key(self, url, credential):
+        return f'session:{registered_domain(url)}:{credential}'
+
+    async def get(self, url, credential):
+        """读取未过期的 storage_state，没有时返回 None"""
+        token = await self.redis.get(self._key(url, credential))
+        if token is None:
+            return None
+        try:
+            return json.loads(self._fernet.decrypt(token.encode()))
+        except InvalidToken:
+            # 密钥更换后旧的登录态无法解密，视为不存在
+            logger.warning(f'Discarding undecryptable session for {registered_domain(url)}')
+            return None
+
+    async def save(self, url, credential, storage_state):
+        ttl = self._expires_in(storage_state)
+        token = self._fernet.encrypt(json.dumps(storage_state).encode()).decode()
+        await self.redis.set(self._key(url, credential), token, ex=ttl)
+
+    async def invalidate(self, url, credential):
+        await self.redis.delete(self._key(url, credential))
+
+    def _expires_in(self, storage_state):
+        now = time.time()
+        expiries = [
+            cookie['expires'] for cookie in storage_state.get('cookies', [])
+            if cookie.get('expires', -1) > now
+        ]
+        if not expiries:
+            return self.ttl
+        return max(1, min(int(min(expiries) - now), self.ttl))
+
+    async def get_or_login(self, url, credential, login):
+        """返回可用的登录态；不存在或已过期时由一个 worker 调用 login() 刷新"""
+        state = await self.get(url, credential)
+        if state is not None:
+            return state
+
+        lock_key = self._key(url, credential) + ':lock'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            if await self.redis.set(lock_key, token, nx=True, ex=self.lock_timeout):
+                try:
+                    # 拿到锁后再查一次，可能刚被其他 worker 刷新
+                    state = await self.get(url, credential)
+                    if state is None:
+                        state = await login()
+                        await self.save(url, credential, state)
+                    return state
+                finally:
+                    await self._release(keys=[lock_key], args=[token])
+
+            await asyncio.sleep(0.5)
+            state = await self.get(url, credential)
+            if state is not None:
+                return state
+            if time.monotonic() > deadline:
+                raise LoginLockTimeout(f'Timed out waiting for login on {registered_domain(url)}')
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import create_engine
+
+from config import Config
+from models import CrawlResult
+from services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+SINK_ITEMS = Counter(
+    'crawler_sink_items_total',
+    'Extracted items handled by the result sink',
+    ['result']
+)
+
+SINK_QUEUE_SIZE = Gauge(
+    'crawler_sink_queue_size',
+    'Items waiting in the result sink queue'
+)
+
+SINK_FLUSH_LATENCY = Histogram(
+    'crawler_sink_flush_seconds',
+    'Bulk write latency of the result sink',
+    ['backend']
+)
+
+_engine = None
+
+
+def get_engine():
+    """结果写入使用独立的连接池，不依赖 Flask 应用上下文"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            os.environ.get('DATABASE_URL', Config.SQLALCHEMY_DATABASE_URI),
+            pool_size=5,
+            pool_recycle=3600,
+            pool_pre_ping=True
+        )
+    return _engine
+
+
+class MySQLResultWriter:
+    """批量写入 crawl_results 表（executemany）"""
+
+    backend = 'mysql'
+
+    async def write(self, items):
+        rows = [
+            {
+                'task_id': item['task_id'],
+                'url': item['url'],
+                'item_type': item['type'],
+                'content': item.get('content') or item.get('src'),
+                'extra': {k: v for k, v in item.items()
+                          if k not in ('task_id', 'url', 'type', 'content', 'src')},
+                'created_at': datetime.utcnow()
+            }
+            for item in items
+        ]
+        await asyncio.to_thread(self._insert, rows)
+
+    def _insert(self, rows):
+        with get_engine().begin() as conn:
+            conn.execute(CrawlResult.__table__.insert(), rows)
+
+
+class ElasticsearchResultWriter:
+    """通过 _bulk API 批量写入 Elasticsearch"""
+
+    backend = 'elasticsearch'
+
+    def __init__(self, index='crawl-results'):
+        self.url = f'{Config.ELASTICSEARCH_URL}/{index}/_bulk'
+
+    async def write(self, items):
+        lines = []
+        for item in items:
+            lines.append('{"index":{}}')
+            lines.append(json.dumps({**item, '@timestamp': datetime.utcnow().isoformat()},
+                                    ensure_ascii=False))
+        body = '\n'.join(lines) + '\n'
+
+        session = await get_session()
+        async with session.post(
+            self.url, data=body.encode(),
+            headers={'Content-Type': 'application/x-ndjson'}
+        ) as response:
+            result = await response.json()
+            if response.status >= 400 or result.get('errors'):
+                raise RuntimeError(f'Elasticsearch bulk write failed: status {response.status}')
+
+
+WRITERS = {
+    'mysql': MySQLResultWriter,
+    'elasticsearch': ElasticsearchResultWriter
+}
+
+
+class ResultSink:
+    """流式结果管道：有界队列 + 按数量/时间批量写入
+
+    队列满时 put 会阻塞，从而对爬虫形成背压。
+    """
+
+    def __init__(self, writer, batch_size=500, flush_interval=2.0, max_queue=5000,
+                 max_attempts=3):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.stats = {'written': 0, 'dropped': 0, 'batches': 0}
+
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._consumer = None
+
+    async def start(self):
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def put(self, item):
+        await self._queue.put(item)
+        SINK_QUEUE_SIZE.inc()
+
+    async def put_many(self, items):
+        for item in items:
+            await self.put(item)
+
+    async def close(self):
+        """写完队列中剩余的数据后停止"""
+        if self._consumer is None:
+            return
+        await self._queue.put(None)
+        await self._consumer
+        self._consumer = None
+
+    async def _consume(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            closing = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            SINK_QUEUE_SIZE.dec(len(batch))
+            await self._flush(batch)
+            if closing:
+                return
+
+    async def _flush(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            try:
+                await self.writer.write(batch)
+            except Exception as e:
+                logger.warning(
+                    f'Result sink write failed ({attempt}/{self.max_attempts}): {e}'
+                )
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(2 ** attempt)
+                continue
+
+            SINK_FLUSH_LATENCY.labels(self.writer.backend).observe(time.perf_counter() - start)
+            SINK_ITEMS.labels('written').inc(len(batch))
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            return
+
+        logger.error(f'Dropping {len(batch)} crawl results after {self.max_attempts} attempts')
+        SINK_ITEMS.labels('dropped').inc(len(batch))
+        self.stats['dropped'] += len(batch)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import zlib
+from collections import namedtuple
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from services.http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+SitemapEntry = namedtuple('SitemapEntry', ['loc', 'lastmod'])
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def default_sitemap_url(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}/sitemap.xml'
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+async def _parse_sitemap(session, url, on_entry, on_sitemap):
+    """流式解析单个 sitemap（支持 .xml.gz），逐条回调，不保留整份文档"""
+    parser = XMLPullParser(events=('start', 'end'))
+    decompressor = None
+    root = None
+    loc = lastmod = None
+
+    async with session.get(url, timeout=30) as response:
+        if response.status != 200:
+            logger.warning(f'Sitemap {url} returned status {response.status}')
+            return
+
+        first = True
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            if first:
+                first = False
+                if chunk[:2] == GZIP_MAGIC:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if root is None:
+                    root = elem
+                if event != 'end':
+                    continue
+
+                name = _local_name(elem.tag)
+                if name == 'loc':
+                    loc = (elem.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = (elem.text or '').strip() or None
+                elif name in ('url', 'sitemap'):
+                    if loc:
+                        if name == 'url':
+                            await on_entry(SitemapEntry(loc, lastmod))
+                        else:
+                            await on_sitemap(loc)
+                    loc = lastmod = None
+                    # 处理完的节点立即释放
+                    root.clear()
+
+    parser.close()
+
+
+async def iter_sitemap(url, session=None, concurrency=4, max_sitemaps=1000, queue_size=1000):
+    """遍历 sitemap 及其索引引用的子 sitemap，逐条产出 SitemapEntry
+
+    子 sitemap 以有限并发抓取；输出队列有界，消费方处理不过来时解析会暂停。
+    """
+    session = session or await get_session()
+    sitemaps = asyncio.Queue()
+    entries = asyncio.Queue(maxsize=queue_size)
+    visited = {url}
+    done = object()
+
+    await sitemaps.put(url)
+
+    async def add_sitemap(child):
+        if child not in visited and len(visited) < max_sitemaps:
+            visited.add(child)
+            await sitemaps.put(child)
+
+    async def worker():
+        while True:
+            sitemap_url = await sitemaps.get()
+            try:
+                await _parse_sitemap(session, sitemap_url, entries.put, add_sitemap)
+            except (ParseError, zlib.error) as e:
+                logger.warning(f'Invalid sitemap {sitemap_url}: {e}')
+            except Exception as e:
+                logger.warning(f'Failed to fetch sitemap {sitemap_url}: {e}')
+            finally:
+                sitemaps.task_done()
+
+    async def supervise():
+        await sitemaps.join()
+        await entries.put(done)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    tasks.append(asyncio.create_task(supervise()))
+    try:
+        while True:
+            entry = await entries.get()
+            if entry is done:
+                return
+            yield entry
+    finally:
+        for task in tasks:
+            task.cancel()
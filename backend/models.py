@@ -56,7 +56,15 @@ class Department(db.Model):
 
 class CrawlTask(db.Model, AuditMixin):
     __tablename__ = 'crawl_tasks'
+    __table_args__ = (
+        # 任务列表按 (created_at, id) 游标分页，以下索引覆盖排序和状态过滤
+        db.Index('ix_crawl_tasks_creator_created', 'created_by', 'created_at', 'id'),
+        db.Index('ix_crawl_tasks_creator_status_created', 'created_by', 'status', 'created_at', 'id'),
+    )
     id = db.Column(db.String(36), primary_key=True)
+    status = db.Column(db.String(20), default='pending')  # pending/running/paused/completed/failed/cancelled
+    urls = db.Column(JSON)  # 起始 URL 列表
+    depth = db.Column(db.Integer, default=2)
     config = db.Column(JSON)  # 包含爬取策略、代理设置等
     result_stats = db.Column(JSON)  # 存储统计信息
     schedule = db.Column(db.String(50))  # 支持定时任务
@@ -65,6 +73,38 @@ class CrawlTask(db.Model, AuditMixin):
     is_approved = db.Column(db.Boolean, default=False)  # 审批流程
     priority = db.Column(db.Integer, default=1)  # 任务优先级
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'urls': self.urls,
+            'depth': self.depth,
+            'status': self.status,
+            'settings': _public_settings(self.config),
+            'result_stats': self.result_stats,
+            'priority': self.priority,
+            'is_approved': self.is_approved,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def _public_settings(config):
+    """对外返回的任务设置，登录配置只保留登录地址，不返回账号和加密凭据"""
+    settings = dict(config or {})
+    if settings.get('login'):
+        settings['login'] = {'url': settings['login'].get('url')}
+    return settings
+
+class CrawlResult(db.Model):
+    __tablename__ = 'crawl_results'
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    task_id = db.Column(db.String(36), index=True, nullable=False)
+    url = db.Column(db.String(2048), nullable=False)
+    item_type = db.Column(db.String(20))  # text / image
+    content = db.Column(db.Text)  # 文本内容或图片地址
+    extra = db.Column(JSON)  # 元素标签、alt 等附加信息
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 def init_db():
     db.create_all()
     
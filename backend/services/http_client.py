@@ -0,0 +1,103 @@
+import asyncio
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager
+import aiohttp
+from config import Config
+
+# 每个事件循环一个共享的 aiohttp 会话和并发信号量，复用连接池
+_sessions = weakref.WeakKeyDictionary()
+_semaphores = weakref.WeakKeyDictionary()
+
+def _create_session():
+    connector = aiohttp.TCPConnector(
+        limit=Config.HTTP_CLIENT_LIMIT,
+        limit_per_host=Config.HTTP_CLIENT_LIMIT_PER_HOST,
+        ttl_dns_cache=Config.HTTP_CLIENT_DNS_TTL,
+        keepalive_timeout=30
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=15)
+    )
+
+async def get_session():
+    """获取当前事件循环上的共享会话"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _create_session()
+        _sessions[loop] = session
+    return session
+
+@asynccontextmanager
+async def limited():
+    """全局并发上限，防止单个请求提交大量 URL 时打满连接"""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(Config.HTTP_CLIENT_MAX_CONCURRENCY)
+    async with semaphore:
+        yield
+
+async def close_session():
+    """关闭当前事件循环上的共享会话"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+class _BackgroundLoop:
+    """同步代码（Flask 视图）使用的常驻事件循环线程
+
+    避免每个请求 asyncio.run() 新建事件循环，使连接池和 DNS 缓存在
+    请求之间复用。fork 之后在子进程中自动重建。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    def _ensure_loop(self):
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name='http-client-loop', daemon=True
+                )
+                thread.start()
+                self._loop = loop
+                self._pid = os.getpid()
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+_background = _BackgroundLoop()
+
+def run_sync(coro, timeout=None):
+    """在共享事件循环上执行协程并等待结果"""
+    return _background.run(coro, timeout)
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+def iterate_sync(agen):
+    """把异步生成器转换为同步生成器，用于流式响应"""
+    try:
+        while True:
+            try:
+                yield run_sync(_anext(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        run_sync(agen.aclose())
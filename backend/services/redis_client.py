@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import weakref
+
+import redis
+import redis.asyncio as aioredis
+
+from config import Config
+
+CONNECTION_OPTIONS = {
+    'decode_responses': True,
+    'socket_timeout': 5,
+    'socket_connect_timeout': 5,
+    'health_check_interval': 30
+}
+
+_sync_client = None
+_sync_pid = None
+_sync_lock = threading.Lock()
+
+# asyncio 连接绑定创建它的事件循环，每个循环一个连接池
+_async_clients = weakref.WeakKeyDictionary()
+_batchers = weakref.WeakKeyDictionary()
+
+
+def get_redis():
+    """进程内共享的同步客户端，供 Flask、Celery 任务和后台线程使用
+
+    连接池达到 REDIS_MAX_CONNECTIONS 时等待空闲连接而不是报错；
+    fork 出的子进程会重新建立连接池。
+    """
+    global _sync_client, _sync_pid
+    if _sync_client is None or _sync_pid != os.getpid():
+        with _sync_lock:
+            if _sync_client is None or _sync_pid != os.getpid():
+                pool = redis.BlockingConnectionPool.from_url(
+                    Config.REDIS_URL,
+                    max_connections=Config.REDIS_MAX_CONNECTIONS,
+                    timeout=5,
+                    **CONNECTION_OPTIONS
+                )
+                _sync_client = redis.Redis(connection_pool=pool)
+                _sync_pid = os.getpid()
+    return _sync_client
+
+
+def get_async_redis():
+    """当前事件循环共享的 asyncio 客户端，需在协程中调用"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            Config.REDIS_URL,
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            timeout=5,
+            **CONNECTION_OPTIONS
+        )
+        client = _async_clients[loop] = aioredis.Redis(connection_pool=pool)
+    return client
+
+
+class PipelineBatcher:
+    """把多个协程的 Redis 写入合并到同一个 pipeline
+
+    execute() 把一组命令加入当前批次，批次攒够 max_batch 条命令或等待
+    max_delay 秒后一次发出，调用方拿到自己那组命令的结果。同一协程内的
+    写入顺序不变，各协程的小写入只需一次往返。
+    """
+
+    def __init__(self, redis_client, max_batch=200, max_delay=0.005):
+        self.redis = redis_client
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._batch = []
+        self._size = 0
+        self._timer = None
+        self._sending = set()
+
+    async def execute(self, *commands):
+        """commands 为 (方法名, 参数...) 元组，按顺序返回各命令的结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append((commands, future))
+        self._size += len(commands)
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch, self._size = self._batch, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for commands, _ in batch:
+                    for name, *args in commands:
+                        getattr(pipe, name)(*args)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for commands, future in batch:
+            chunk = results[offset:offset + len(commands)]
+            offset += len(commands)
+            if future.done():
+                continue
+            error = next((result for result in chunk if isinstance(result, Exception)), None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(chunk)
+
+
+def pipeline_batcher(redis_client):
+    """返回该客户端共享的批量写入器，同一循环内的所有组件合并写入"""
+    batcher = _batchers.get(redis_client)
+    if batcher is None:
+        batcher = _batchers[redis_client] = PipelineBatcher(redis_client)
+    return batcher
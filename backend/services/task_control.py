@@ -0,0 +1,19 @@
+# 任务控制状态：API 进程写入，爬虫进程读取，用于暂停/恢复/取消
+CONTROL_KEY = 'task:{}:control'
+CONTROL_TTL = 7 * 24 * 3600
+
+def set_task_control(redis_client, task_id, status):
+    """记录任务的目标状态"""
+    redis_client.set(CONTROL_KEY.format(task_id), status, ex=CONTROL_TTL)
+
+def get_task_controls(redis_client, task_ids):
+    """批量读取任务的目标状态，未设置的不返回"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return {}
+    values = redis_client.mget([CONTROL_KEY.format(task_id) for task_id in task_ids])
+    return {
+        task_id: value.decode() if isinstance(value, bytes) else value
+        for task_id, value in zip(task_ids, values)
+        if value is not None
+    }
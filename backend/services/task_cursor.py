@@ -0,0 +1,17 @@
+# 任务列表的游标分页：游标是 (created_at, id) 的 URL 安全编码
+from datetime import datetime
+import base64
+import json
+
+def encode_cursor(task):
+    """把最后一条任务的 (created_at, id) 编码为不透明的游标"""
+    value = json.dumps([task.created_at.isoformat(), task.id])
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+def decode_cursor(cursor):
+    """解析游标，格式不对时抛出 ValueError"""
+    try:
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), task_id
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
@@ -1,35 +1,264 @@
 import asyncio
-from collections import deque
+import heapq
+import itertools
+import logging
+import time
+import redis
+from prometheus_client import Gauge, Histogram
+from services.redis_client import get_redis
+from services.task_control import get_task_controls
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = Gauge(
+    'crawl_queue_depth',
+    'Crawl tasks waiting in the queue'
+)
+
+QUEUE_ACTIVE = Gauge(
+    'crawl_queue_active',
+    'Crawl tasks currently running'
+)
+
+QUEUE_WAIT_TIME = Histogram(
+    'crawl_queue_wait_seconds',
+    'Time crawl tasks spend waiting for a slot',
+    buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600)
+)
+
+class QueuedTask:
+    """队列中的一个任务"""
+
+    def __init__(self, task_func, args, task_id, user_id, priority, future, seq):
+        self.task_func = task_func
+        self.args = args
+        self.task_id = task_id
+        self.user_id = user_id
+        self.priority = priority
+        self.future = future
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.paused = False
+
+    def sort_key(self):
+        # 优先级高的先执行，同优先级先进先出
+        return (-self.priority, self.seq)
 
 class CrawlQueue:
-    def __init__(self, max_concurrent=10):
+    """有界并发的爬虫任务调度器
+
+    并发上限由信号量保证；按用户公平分配执行槽位（运行中任务最少的
+    用户优先），同一用户内部按 priority 排序。通过轮询任务控制状态
+    响应 TaskActionAPI 的暂停/恢复/取消。
+    """
+
+    def __init__(self, max_concurrent=10, control_poll_interval=2.0):
         self.max_concurrent = max_concurrent
-        self.active_tasks = set()
-        self.pending_queue = deque()
-        self.loop = asyncio.get_event_loop()
-        
-    async def add_task(self, task_func, *args):
-        """添加任务到队列"""
-        if len(self.active_tasks) >= self.max_concurrent:
-            future = self.loop.create_future()
-            self.pending_queue.append((future, task_func, args))
-            await future
-        else:
-            await self._execute(task_func, *args)
-    
-    async def _execute(self, task_func, *args):
-        """实际执行任务"""
-        task = asyncio.create_task(task_func(*args))
-        self.active_tasks.add(task)
-        task.add_done_callback(self._on_task_done)
-        
-    def _on_task_done(self, task):
-        """任务完成回调"""
-        self.active_tasks.remove(task)
-        if self.pending_queue:
-            future, task_func, args = self.pending_queue.popleft()
-            future.set_result(None)
-            asyncio.create_task(self._execute(task_func, *args))
+        self.control_poll_interval = control_poll_interval
+
+        self._pending = {}
+        self._active_by_user = {}
+        self._running = {}
+        self._counter = itertools.count()
+        self._loop = None
+        self._slots = None
+        self._cond = None
+        self._dispatcher = None
+        self._control_watcher = None
+
+    @property
+    def active_tasks(self):
+        return {task for task, _ in self._running.values()}
+
+    @property
+    def pending_count(self):
+        return sum(len(heap) for heap in self._pending.values())
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._cond = asyncio.Condition()
+        self._dispatcher = loop.create_task(self._dispatch())
+        self._control_watcher = loop.create_task(self._watch_control())
+
+    async def submit(self, task_func, *args, task_id=None, user_id=None, priority=1):
+        """加入队列，返回任务结束时完成的 future"""
+        self._ensure_started()
+
+        entry = QueuedTask(
+            task_func, args, task_id, user_id, priority or 0,
+            self._loop.create_future(), next(self._counter)
+        )
+        async with self._cond:
+            heapq.heappush(
+                self._pending.setdefault(user_id, []),
+                (entry.sort_key(), entry)
+            )
+            QUEUE_DEPTH.set(self.pending_count)
+            self._cond.notify()
+        return entry.future
+
+    async def add_task(self, task_func, *args, task_id=None, user_id=None, priority=1):
+        """添加任务到队列并等待其执行完成"""
+        future = await self.submit(
+            task_func, *args, task_id=task_id, user_id=user_id, priority=priority
+        )
+        return await future
+
+    def _next_entry(self):
+        """选出下一个要执行的任务：运行中任务最少的用户优先"""
+        best = None
+        for user_id, heap in self._pending.items():
+            runnable = [item for item in heap if not item[1].paused]
+            if not runnable:
+                continue
+            head = min(runnable, key=lambda item: item[0])
+            rank = (self._active_by_user.get(user_id, 0), head[0])
+            if best is None or rank < best[0]:
+                best = (rank, user_id, head)
+
+        if best is None:
+            return None
+
+        _, user_id, head = best
+        heap = self._pending[user_id]
+        heap.remove(head)
+        heapq.heapify(heap)
+        if not heap:
+            del self._pending[user_id]
+        return head[1]
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            async with self._cond:
+                entry = self._next_entry()
+                while entry is None:
+                    await self._cond.wait()
+                    entry = self._next_entry()
+                QUEUE_DEPTH.set(self.pending_count)
+
+            QUEUE_WAIT_TIME.observe(time.monotonic() - entry.enqueued_at)
+            self._active_by_user[entry.user_id] = self._active_by_user.get(entry.user_id, 0) + 1
+            task = self._loop.create_task(self._run(entry))
+            self._running[entry.task_id or id(task)] = (task, entry)
+            QUEUE_ACTIVE.set(len(self._running))
+
+    async def _run(self, entry):
+        key = entry.task_id or id(asyncio.current_task())
+        try:
+            result = await entry.task_func(*entry.args)
+            if not entry.future.done():
+                entry.future.set_result(result)
+        except asyncio.CancelledError:
+            if entry.paused:
+                # 暂停的任务重新排队，恢复后再次执行
+                async with self._cond:
+                    heapq.heappush(
+                        self._pending.setdefault(entry.user_id, []),
+                        (entry.sort_key(), entry)
+                    )
+                    QUEUE_DEPTH.set(self.pending_count)
+            elif not entry.future.done():
+                entry.future.cancel()
+        except Exception as e:
+            if not entry.future.done():
+                entry.future.set_exception(e)
+        finally:
+            self._running.pop(key, None)
+            self._active_by_user[entry.user_id] -= 1
+            if not self._active_by_user[entry.user_id]:
+                del self._active_by_user[entry.user_id]
+            QUEUE_ACTIVE.set(len(self._running))
+            self._slots.release()
+
+    def _find_pending(self, task_id):
+        for heap in self._pending.values():
+            for _, entry in heap:
+                if entry.task_id == task_id:
+                    return entry
+        return None
+
+    async def pause(self, task_id):
+        """暂停任务：排队中的跳过调度，运行中的中断后重新排队"""
+        async with self._cond:
+            entry = self._find_pending(task_id)
+            if entry is not None:
+                entry.paused = True
+                return True
+
+        running = self._running.get(task_id)
+        if running is None:
+            return False
+        task, entry = running
+        entry.paused = True
+        task.cancel()
+        return True
+
+    async def resume(self, task_id):
+        """恢复暂停的任务"""
+        async with self._cond:
+            entry = self._find_pending(task_id)
+            if entry is None or not entry.paused:
+                return False
+            entry.paused = False
+            self._cond.notify()
+            return True
+
+    async def cancel(self, task_id):
+        """取消排队中或运行中的任务"""
+        async with self._cond:
+            for user_id, heap in list(self._pending.items()):
+                for item in heap:
+                    if item[1].task_id == task_id:
+                        heap.remove(item)
+                        heapq.heapify(heap)
+                        if not heap:
+                            del self._pending[user_id]
+                        item[1].future.cancel()
+                        QUEUE_DEPTH.set(self.pending_count)
+                        return True
+
+        running = self._running.get(task_id)
+        if running is None:
+            return False
+        running[0].cancel()
+        return True
+
+    async def _watch_control(self):
+        """轮询任务控制状态，执行 API 端发起的暂停/恢复/取消"""
+        while True:
+            await asyncio.sleep(self.control_poll_interval)
+
+            task_ids = {
+                entry.task_id
+                for heap in self._pending.values()
+                for _, entry in heap
+                if entry.task_id
+            }
+            task_ids.update(k for k in self._running if isinstance(k, str))
+            if not task_ids:
+                continue
+
+            try:
+                controls = await asyncio.to_thread(
+                    get_task_controls, get_redis(), task_ids
+                )
+            except redis.RedisError as e:
+                logger.warning(f'Failed to poll task control state: {e}')
+                continue
+
+            for task_id, status in controls.items():
+                if status == 'cancelled':
+                    await self.cancel(task_id)
+                elif status == 'paused':
+                    await self.pause(task_id)
+                elif status == 'running':
+                    await self.resume(task_id)
 
 # 全局队列实例
-crawl_queue = CrawlQueue(max_concurrent=10)
\ No newline at end of file
+crawl_queue = CrawlQueue(max_concurrent=10)
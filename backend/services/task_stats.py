@@ -0,0 +1,55 @@
+# 任务统计汇总：按用户在 Redis 中增量维护，TaskStatsAPI 直接读取
+from datetime import datetime, timedelta
+
+STATUS_KEY = 'task:stats:{}:status'
+DAILY_KEY = 'task:stats:{}:daily'
+DAILY_RETENTION_DAYS = 90
+
+def _day(value):
+    return value.strftime('%Y-%m-%d')
+
+def record_task_created(redis_client, user_id, status='pending', created_at=None, count=1):
+    """新建任务时计入状态计数和当天的创建数，批量创建时传入 count"""
+    day = _day(created_at or datetime.utcnow())
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hincrby(STATUS_KEY.format(user_id), status, count)
+    pipe.hincrby(DAILY_KEY.format(user_id), day, count)
+    pipe.execute()
+
+def record_status_change(redis_client, user_id, old_status, new_status):
+    """任务状态变化时把计数从旧状态移到新状态"""
+    if old_status == new_status:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hincrby(STATUS_KEY.format(user_id), old_status, -1)
+    pipe.hincrby(STATUS_KEY.format(user_id), new_status, 1)
+    pipe.execute()
+
+def get_task_stats(redis_client, user_id, days=7):
+    """返回 (各状态任务数, 最近 days 天每天的创建数)"""
+    today = datetime.utcnow().date()
+    dates = [_day(today - timedelta(days=offset)) for offset in range(days, -1, -1)]
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(STATUS_KEY.format(user_id))
+    pipe.hmget(DAILY_KEY.format(user_id), dates)
+    status_counts, daily_counts = pipe.execute()
+
+    total_stats = {status: int(count) for status, count in status_counts.items() if int(count) > 0}
+    weekly_trend = {date: int(count) for date, count in zip(dates, daily_counts) if count is not None}
+    return total_stats, weekly_trend
+
+def replace_task_stats(redis_client, user_id, status_counts, daily_counts):
+    """用数据库中的实际计数重建某个用户的汇总（回填和校正用）"""
+    status_key = STATUS_KEY.format(user_id)
+    daily_key = DAILY_KEY.format(user_id)
+    cutoff = _day(datetime.utcnow() - timedelta(days=DAILY_RETENTION_DAYS))
+    daily_counts = {day: count for day, count in daily_counts.items() if day >= cutoff}
+
+    pipe = redis_client.pipeline()
+    pipe.delete(status_key, daily_key)
+    if status_counts:
+        pipe.hset(status_key, mapping=status_counts)
+    if daily_counts:
+        pipe.hset(daily_key, mapping=daily_counts)
+    pipe.execute()
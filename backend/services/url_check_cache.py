@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from prometheus_client import Counter
+
+from config import Config
+from services.redis_client import get_async_redis
+
+URL_CHECK_CACHE = Counter(
+    'url_check_cache_total',
+    'URL check lookups by cache result',
+    ['result']
+)
+
+URL_KEY = 'urlcheck:url:{}'
+HOST_KEY = 'urlcheck:host:{}'
+
+# 连接失败（DNS 解析失败、拒绝连接）说明整个 host 不可达
+HOST_ERRORS = (aiohttp.ClientConnectorError,)
+
+
+def _digest(url):
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+class UrlCheckCache:
+    """URL 检查结果缓存
+
+    成功和失败结果分别设置 TTL；host 不可达时按 host 做负缓存，同一 host
+    的其他 URL 直接返回失败。并发检查同一 URL 时共享一个进行中的请求。
+    """
+
+    def __init__(self, success_ttl=3600, failure_ttl=300):
+        self.success_ttl = success_ttl
+        self.failure_ttl = failure_ttl
+        self._inflight = {}
+
+    async def get_many(self, urls):
+        """批量读取缓存，返回 {url: result}，一次 MGET 同时查 URL 和 host"""
+        urls = list(dict.fromkeys(urls))
+        hosts = list({urlsplit(url).netloc for url in urls})
+        keys = [URL_KEY.format(_digest(url)) for url in urls]
+        keys += [HOST_KEY.format(host) for host in hosts]
+
+        try:
+            values = await get_async_redis().mget(keys) if keys else []
+        except Exception:
+            # 缓存不可用时退化为直接检查
+            return {}
+
+        host_errors = {
+            host: value for host, value in zip(hosts, values[len(urls):]) if value
+        }
+
+        results = {}
+        for url, value in zip(urls, values):
+            if value:
+                results[url] = dict(json.loads(value), url=url, cached=True)
+            elif urlsplit(url).netloc in host_errors:
+                results[url] = {
+                    'url': url,
+                    'valid': False,
+                    'error': host_errors[urlsplit(url).netloc],
+                    'cached': True
+                }
+
+        URL_CHECK_CACHE.labels('hit').inc(len(results))
+        URL_CHECK_CACHE.labels('miss').inc(len(urls) - len(results))
+        return results
+
+    async def check(self, url, check_func):
+        """检查单个 URL，同一 URL 的并发请求合并为一次"""
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._check_and_store(url, check_func))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        else:
+            URL_CHECK_CACHE.labels('coalesced').inc()
+        # shield：一个调用方被取消不影响其他等待同一结果的调用方
+        return dict(await asyncio.shield(task))
+
+    async def _check_and_store(self, url, check_func):
+        result, error = await check_func(url)
+        try:
+            await self._store(url, result, error)
+        except Exception:
+            pass
+        return result
+
+    async def _store(self, url, result, error):
+        redis = get_async_redis()
+        if isinstance(error, HOST_ERRORS):
+            await redis.set(HOST_KEY.format(urlsplit(url).netloc), result['error'], ex=self.failure_ttl)
+            return
+
+        # 超时等没有状态码的失败同样按 failure_ttl 缓存，避免最慢的检查被反复执行
+        value = {key: value for key, value in result.items() if key != 'url'}
+        value['checked_at'] = int(time.time())
+        ttl = self.success_ttl if result['valid'] else self.failure_ttl
+        await redis.set(URL_KEY.format(_digest(url)), json.dumps(value), ex=ttl)
+
+
+url_check_cache = UrlCheckCache(
+    success_ttl=Config.URL_CHECK_CACHE_TTL,
+    failure_ttl=Config.URL_CHECK_FAILURE_TTL
+)
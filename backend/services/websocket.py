@@ -1,22 +1,219 @@
-from flask_socketio import SocketIO, emit
+from flask import current_app, session
+from flask_jwt_extended import decode_token
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from datetime import datetime
 import json
+import logging
+import os
+import threading
+import time
+from config import Config
+from models import CrawlTask
+from services.redis_client import get_redis
 
-socketio = SocketIO(cors_allowed_origins="*")
+logger = logging.getLogger(__name__)
+
+# 通过 Redis 消息队列在多个 API 进程间分发事件，Celery worker 也可以直接推送
+socketio = SocketIO(cors_allowed_origins="*", message_queue=Config.SOCKETIO_MESSAGE_QUEUE)
+
+TERMINAL_STATUSES = {'completed', 'failed', 'cancelled'}
+
+PROGRESS_KEY = 'task:{}:progress'
+PROGRESS_VERSIONS_KEY = 'task:{}:progress:versions'
+PROGRESS_TTL = 7 * 24 * 3600
+# 超过该时间没有推送的任务不再需要限流记录，定期清理
+LAST_EMIT_TTL = 600
+
+# 快照版本号加一，记录本次变化的字段及其版本；ARGV[1] 为过期时间，之后是字段名和值
+SAVE_PROGRESS_SCRIPT = """
+local version = redis.call('HINCRBY', KEYS[1], '_version', 1)
+for i = 2, #ARGV - 1, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    redis.call('HSET', KEYS[2], ARGV[i], version)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return version
+"""
+
+class ProgressAggregator:
+    """任务进度合并推送
+
+    update() 只在内存中合并字段，不做任何 IO；后台线程按任务把多次更新
+    合并为一次推送，每个任务每秒最多推送 max_emits_per_second 次，
+    进入终止状态（完成、失败、取消）时立即推送。每次推送同时写入 Redis
+    中带版本号的快照，断线重连的客户端据此只补齐变化的字段。
+    """
+
+    def __init__(self, max_emits_per_second=2.0):
+        self.interval = 1.0 / max_emits_per_second
+        self._pending = {}
+        self._last_emit = {}
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._redis = None
+        self._save = None
+
+    def update(self, task_id, **fields):
+        """记录任务的最新进度字段"""
+        with self._lock:
+            self._pending.setdefault(task_id, {}).update(fields)
+        if fields.get('status') in TERMINAL_STATUSES:
+            self._wakeup.set()
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        # fork 出的子进程（Celery prefork）里需要重新启动线程和连接
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._redis = get_redis()
+            self._save = self._redis.register_script(SAVE_PROGRESS_SCRIPT)
+            self._thread = threading.Thread(target=self._run, name='progress-aggregator', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to publish task progress')
+
+    def flush(self, force=False):
+        """推送到期的合并更新；force 为 True 时推送全部"""
+        now = time.monotonic()
+        due = {}
+        with self._lock:
+            for task_id, fields in list(self._pending.items()):
+                terminal = fields.get('status') in TERMINAL_STATUSES
+                if force or terminal or now - self._last_emit.get(task_id, 0) >= self.interval:
+                    due[task_id] = self._pending.pop(task_id)
+                    if terminal:
+                        self._last_emit.pop(task_id, None)
+                    else:
+                        self._last_emit[task_id] = now
+            if now - self._last_sweep >= LAST_EMIT_TTL:
+                # 没收到终止状态就停止更新的任务（worker 崩溃等）也会被清理
+                self._last_emit = {
+                    task_id: emitted for task_id, emitted in self._last_emit.items()
+                    if now - emitted < LAST_EMIT_TTL
+                }
+                self._last_sweep = now
+        if not due:
+            return
+
+        timestamp = datetime.now().isoformat()
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for task_id, fields in due.items():
+                fields['timestamp'] = timestamp
+                args = [PROGRESS_TTL]
+                for name, value in fields.items():
+                    args.extend((name, json.dumps(value)))
+                self._save(
+                    keys=[PROGRESS_KEY.format(task_id), PROGRESS_VERSIONS_KEY.format(task_id)],
+                    args=args,
+                    client=pipe
+                )
+            versions = pipe.execute()
+
+            for (task_id, fields), version in zip(list(due.items()), versions):
+                socketio.emit('task_progress', dict(fields, task_id=task_id, version=version), room=task_id)
+                del due[task_id]
+        except Exception:
+            self._requeue(due)
+            raise
+
+    def _requeue(self, due):
+        """推送失败时放回未送出的更新，下个周期重试；期间的新字段优先"""
+        with self._lock:
+            for task_id, fields in due.items():
+                self._pending[task_id] = {**fields, **self._pending.get(task_id, {})}
+                if fields.get('status') in TERMINAL_STATUSES:
+                    self._wakeup.set()
+
+progress_aggregator = ProgressAggregator(Config.PROGRESS_MAX_EMITS_PER_SECOND)
+
+def get_progress_delta(redis_client, task_id, since=0):
+    """返回 since 版本之后变化的进度字段；since 无效时返回完整快照"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(PROGRESS_KEY.format(task_id))
+    pipe.hgetall(PROGRESS_VERSIONS_KEY.format(task_id))
+    snapshot, field_versions = pipe.execute()
+
+    version = int(snapshot.pop('_version', 0))
+    full = not since or since > version
+    return {
+        'task_id': task_id,
+        'version': version,
+        'full': full,
+        'fields': {
+            name: json.loads(value)
+            for name, value in snapshot.items()
+            if full or int(field_versions.get(name, 0)) > since
+        }
+    }
 
 class ProgressReporter:
     def __init__(self, task_id):
         self.task_id = task_id
-    
-    def update(self, progress, status, message=""):
-        """推送进度更新"""
-        socketio.emit('task_progress', {
-            'task_id': self.task_id,
-            'progress': progress,
-            'status': status,
-            'message': message,
-            'timestamp': datetime.now().isoformat()
-        }, room=self.task_id)
+
+    def update(self, progress, status, message="", **fields):
+        """推送进度更新（合并限流，终止状态立即推送）；progress 为 None 时保留上次的进度"""
+        if progress is not None:
+            fields['progress'] = progress
+        progress_aggregator.update(
+            self.task_id,
+            status=status,
+            message=message,
+            **fields
+        )
+
+@socketio.on('connect')
+def on_connect(auth):
+    """连接时校验 JWT（io(url, {auth: {token}})），拒绝未登录的客户端"""
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    if not token:
+        return False
+    try:
+        session['user_id'] = decode_token(token)['sub']
+    except Exception:
+        return False
+
+@socketio.on('join')
+def on_join(data):
+    """订阅任务进度；带上已收到的 version 时只补发之后的变化"""
+    if not isinstance(data, dict):
+        return
+    task_id = data.get('task_id')
+    if not task_id:
+        return
+    # 只能订阅自己创建的任务
+    task = CrawlTask.query.get(task_id)
+    if task is None or task.created_by != session.get('user_id'):
+        emit('task_progress_error', {'task_id': task_id, 'error': 'Unauthorized'})
+        return
+    try:
+        since = max(int(data.get('version') or 0), 0)
+    except (TypeError, ValueError):
+        since = 0
+    join_room(task_id)
+    emit('task_progress_snapshot', get_progress_delta(current_app.redis, task_id, since))
+
+@socketio.on('leave')
+def on_leave(data):
+    task_id = data.get('task_id') if isinstance(data, dict) else None
+    if task_id:
+        leave_room(task_id)
 
 # 在Flask初始化时附加
 def init_app(app):
-    socketio.init_app(app)
\ No newline at end of file
+    socketio.init_app(app)
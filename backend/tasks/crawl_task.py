@@ -1,12 +1,18 @@
-from .services.task_queue import crawl_queue
-from .services.websocket import ProgressReporter
+import asyncio
 
-async def crawl_site(url, depth, task_id):
+from crawler.browser_pool import browser_pool
+from services.task_queue import crawl_queue
+from services.websocket import ProgressReporter
+
+async def crawl_site(url, depth, task_id, user_id=None, priority=1):
     reporter = ProgressReporter(task_id)
     
     try:
         # 加入队列等待执行
-        await crawl_queue.add_task(_crawl_site, url, depth, reporter)
+        await crawl_queue.add_task(
+            _crawl_site, url, depth, reporter,
+            task_id=task_id, user_id=user_id, priority=priority
+        )
     except Exception as e:
         reporter.update(0, 'failed', str(e))
 
@@ -14,10 +20,8 @@ async def _crawl_site(url, depth, reporter):
     """实际爬取逻辑"""
     reporter.update(0, 'analyzing', '开始分析页面结构')
     
-    browser = await launch(headless=True)
-    page = await browser.newPage()
-    
-    try:
+    # 页面从共享浏览器池获取，退出时自动关闭上下文
+    async with browser_pool.new_page() as page:
         # 示例：分阶段更新进度
         await page.goto(url)
         reporter.update(30, 'running', '加载页面完成')
@@ -30,5 +34,3 @@ async def _crawl_site(url, depth, reporter):
         reporter.update(90, 'running', '数据存储中')
         
         reporter.update(100, 'completed', '任务完成')
-    finally:
-        await browser.close()
\ No newline at end of file
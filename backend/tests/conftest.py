@@ -0,0 +1,126 @@
+import os
+import sys
+
+import pytest
+
+# 测试按 backend 目录下的顶层包导入（crawler、services、api）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakePipeline:
+    """按顺序记录命令，execute 时依次在 FakeRedis 上执行"""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self, raise_on_error=True):
+        self.redis.pipelines.append([name for name, _, _ in self.commands])
+        if self.redis.fail:
+            raise ConnectionError('connection lost')
+        results = []
+        for name, args, kwargs in self.commands:
+            try:
+                results.append(getattr(self.redis, name)(*args, **kwargs))
+            except Exception as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
+
+
+class AsyncFakePipeline(FakePipeline):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, raise_on_error=True):
+        return FakePipeline.execute(self, raise_on_error)
+
+
+class FakeRedis:
+    """内存中的 Redis 替身，只实现测试用到的命令，值按 decode_responses 存成字符串
+
+    pipelines 记录每次执行的 pipeline，fail 为 True 时执行 pipeline 抛出连接错误。
+    """
+
+    pipeline_class = FakePipeline
+
+    def __init__(self):
+        self.data = {}
+        self.pipelines = []
+        self.fail = False
+
+    def pipeline(self, transaction=True):
+        return self.pipeline_class(self)
+
+    def _typed(self, key, kind):
+        value = self.data.setdefault(key, kind())
+        if not isinstance(value, kind):
+            raise TypeError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, str):
+            raise TypeError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = str(value)
+        return True
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self.data[key] = str(value)
+        return value
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def hget(self, key, field):
+        return self._typed(key, dict).get(field)
+
+    def hgetall(self, key):
+        return dict(self._typed(key, dict))
+
+    def hmget(self, key, fields):
+        values = self._typed(key, dict)
+        return [values.get(field) for field in fields]
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self._typed(key, dict)
+        mapping = dict(mapping or {})
+        if field is not None:
+            mapping[field] = value
+        values.update({name: str(item) for name, item in mapping.items()})
+        return len(mapping)
+
+    def hincrby(self, key, field, amount=1):
+        values = self._typed(key, dict)
+        values[field] = str(int(values.get(field, 0)) + amount)
+        return int(values[field])
+
+
+class AsyncFakeRedis(FakeRedis):
+    """redis.asyncio 客户端的替身，命令通过 pipeline 执行"""
+
+    pipeline_class = AsyncFakePipeline
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def fake_async_redis():
+    return AsyncFakeRedis()
@@ -0,0 +1,73 @@
+from crawler.dedup import ContentDeduplicator, normalize_text, simhash
+
+ARTICLE = (
+    'The crawler visits every page of the site breadth first, extracts paragraphs, '
+    'headings and images, and stores the results for the task. Duplicate paragraphs '
+    'that appear in headers, footers and sidebars are removed before saving so that '
+    'the exported data only contains the main content of each page.'
+)
+
+
+def text(content):
+    return {'type': 'text', 'content': content}
+
+
+def flip_bits(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+class TestSimhash:
+    def test_ignores_whitespace_and_punctuation(self):
+        assert simhash('updated on 2023-01-05, 12 comments') == simhash('updated  on 2023/01/05 -- 12 comments')
+
+    def test_small_edit_stays_within_distance(self):
+        edited = ARTICLE.replace('main content', 'main contents')
+        assert bin(simhash(ARTICLE) ^ simhash(edited)).count('1') <= 5
+
+    def test_unrelated_text_is_far_apart(self):
+        other = '登录后可以查看任务进度、导出结果，并在任务失败时收到通知。'
+        assert bin(simhash(ARTICLE) ^ simhash(other)).count('1') > 5
+
+
+class TestContentDeduplicator:
+    def test_band_layout(self):
+        dedup = ContentDeduplicator(max_distance=5)
+        assert dedup.band_count == 6
+        assert dedup.band_bits == 10
+
+    def test_exact_duplicates_after_normalization(self):
+        dedup = ContentDeduplicator()
+        items = [text('Hello   World'), text(' hello world '), {'type': 'image', 'src': 'a.png'},
+                 {'type': 'image', 'src': 'a.png'}]
+        assert dedup.filter(items) == [items[0], items[2]]
+        assert dedup.stats == {'seen': 4, 'exact': 2, 'near': 0, 'ratio': 0.5}
+        assert normalize_text(' Hello \n World ') == 'hello world'
+
+    def test_near_duplicates_are_filtered(self):
+        dedup = ContentDeduplicator()
+        edited = ARTICLE.replace('main content', 'main contents')
+        assert dedup.filter([text(ARTICLE), text(edited)]) == [text(ARTICLE)]
+        assert dedup.stats['near'] == 1
+
+    def test_pages_differing_in_numbers_are_kept(self):
+        dedup = ContentDeduplicator()
+        orders = [
+            text('Order 1024 placed by customer 311, total 199.00, shipped 2024-03-02'),
+            text('Order 2048 placed by customer 875, total 349.50, shipped 2024-06-17'),
+        ]
+        assert dedup.filter(orders) == orders
+
+    def test_negative_distance_disables_near_dedup(self):
+        dedup = ContentDeduplicator(max_distance=-1)
+        edited = ARTICLE.replace('main content', 'main contents')
+        assert len(dedup.filter([text(ARTICLE), text(edited)])) == 2
+
+    def test_band_index_finds_fingerprints_within_distance(self):
+        dedup = ContentDeduplicator(max_distance=5)
+        fingerprint = 0x0123456789ABCDEF
+        dedup._index(fingerprint)
+        # 每段翻转一位也只有 5 位不同，剩下一段仍然相同
+        assert dedup._near_duplicate(flip_bits(fingerprint, [0, 10, 20, 30, 40]))
+        assert not dedup._near_duplicate(flip_bits(fingerprint, [0, 10, 20, 30, 40, 50]))
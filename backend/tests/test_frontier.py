@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+from crawler.frontier import UrlFrontier, normalize_url
+
+
+def drain(frontier):
+    """依次取出并完成所有 URL，返回抓取顺序"""
+    async def run():
+        order = []
+        while True:
+            item = await frontier.get()
+            if item is None:
+                return order
+            order.append(item)
+            await frontier.done(item[0])
+    return asyncio.run(run())
+
+
+class TestNormalizeUrl:
+    def test_lowercases_host_and_drops_default_port_and_fragment(self):
+        assert normalize_url('HTTP://Example.COM:80/a?b=2&a=1#top') == 'http://example.com/a?a=1&b=2'
+
+    def test_keeps_non_default_port_and_adds_root_path(self):
+        assert normalize_url('https://example.com:8443') == 'https://example.com:8443/'
+
+    def test_rejects_non_http_and_invalid_urls(self):
+        assert normalize_url('mailto:someone@example.com') is None
+        assert normalize_url('javascript:void(0)') is None
+        assert normalize_url('http://example.com:notaport/') is None
+        assert normalize_url(None) is None
+
+
+class TestUrlFrontier:
+    def test_put_deduplicates_normalized_urls_and_limits_depth(self):
+        frontier = UrlFrontier(max_depth=1, delay=0)
+
+        async def run():
+            return [
+                await frontier.put('http://example.com/a#x'),
+                await frontier.put('http://EXAMPLE.com/a'),
+                await frontier.put('http://example.com/b', depth=2),
+                await frontier.put('ftp://example.com/c'),
+            ]
+
+        assert asyncio.run(run()) == [True, False, False, False]
+        assert len(frontier) == 1
+        assert frontier.seen_count == 1
+
+    def test_get_returns_none_when_exhausted(self):
+        frontier = UrlFrontier(delay=0)
+
+        async def run():
+            await frontier.put('http://example.com/')
+            await frontier.put('http://example.com/next', depth=1)
+
+        asyncio.run(run())
+        assert drain(frontier) == [('http://example.com/', 0), ('http://example.com/next', 1)]
+
+    def test_requests_per_host_are_limited(self):
+        frontier = UrlFrontier(delay=0, host_concurrency=2)
+
+        async def run():
+            for i in range(3):
+                await frontier.put(f'http://a.com/{i}')
+            await frontier.put('http://b.com/1')
+            leased = [await frontier.get() for _ in range(3)]
+            # a.com 已有两个请求在进行，第三个要等其中一个完成
+            waiting = asyncio.create_task(frontier.get())
+            await asyncio.sleep(0.01)
+            blocked = not waiting.done()
+            await frontier.done(leased[0][0])
+            return leased, blocked, await waiting
+
+        leased, blocked, third = asyncio.run(run())
+        assert sorted(url for url, _ in leased) == ['http://a.com/0', 'http://a.com/1', 'http://b.com/1']
+        assert blocked
+        assert third[0] == 'http://a.com/2'
+
+    def test_delay_spaces_request_starts_per_host(self):
+        frontier = UrlFrontier(delay=0.05, host_concurrency=4)
+
+        async def run():
+            await frontier.put('http://a.com/1')
+            await frontier.put('http://a.com/2')
+            await frontier.get()
+            started = time.monotonic()
+            await frontier.get()
+            return time.monotonic() - started
+
+        assert asyncio.run(run()) >= 0.04
+
+    def test_release_puts_url_back_at_the_front(self):
+        frontier = UrlFrontier(delay=0)
+
+        async def run():
+            await frontier.put('http://example.com/1')
+            await frontier.put('http://example.com/2')
+            url, depth = await frontier.get()
+            await frontier.release(url, depth)
+
+        asyncio.run(run())
+        assert [url for url, _ in drain(frontier)] == ['http://example.com/1', 'http://example.com/2']
+
+    def test_retry_requeues_after_delay(self):
+        frontier = UrlFrontier(delay=0)
+
+        async def run():
+            await frontier.put('http://example.com/')
+            url, depth = await frontier.get()
+            assert await frontier.count_failure(url) == 1
+            await frontier.retry(url, depth, 0.01)
+            return await frontier.get()
+
+        assert asyncio.run(run()) == ('http://example.com/', 0)
+
+    def test_snapshot_includes_leased_and_restores(self):
+        frontier = UrlFrontier(delay=0)
+
+        async def run():
+            await frontier.put('http://example.com/1')
+            await frontier.put('http://example.com/2', depth=1)
+            await frontier.get()
+
+        asyncio.run(run())
+        snapshot = frontier.snapshot()
+        assert sorted(snapshot['pending']) == [('http://example.com/1', 0), ('http://example.com/2', 1)]
+
+        restored = UrlFrontier(delay=0)
+        restored.restore({'pending': snapshot['pending'], 'seen': snapshot['new_seen']})
+        assert not asyncio.run(restored.put('http://example.com/1'))
+        assert sorted(drain(restored)) == [('http://example.com/1', 0), ('http://example.com/2', 1)]
+
+    def test_snapshot_exports_only_unsaved_seen_urls(self):
+        frontier = UrlFrontier(delay=0)
+
+        async def put(*urls):
+            for url in urls:
+                await frontier.put(url)
+
+        asyncio.run(put('http://example.com/1', 'http://example.com/2'))
+        assert frontier.snapshot()['new_seen'] == ['http://example.com/1', 'http://example.com/2']
+        frontier.mark_seen_saved(1)
+        asyncio.run(put('http://example.com/3'))
+        assert frontier.snapshot()['new_seen'] == ['http://example.com/2', 'http://example.com/3']
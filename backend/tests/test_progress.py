@@ -0,0 +1,88 @@
+import fakeredis
+import pytest
+
+from services import websocket
+from services.websocket import (
+    LAST_EMIT_TTL, SAVE_PROGRESS_SCRIPT, ProgressAggregator, ProgressReporter, get_progress_delta
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(websocket.time, 'monotonic', fake)
+    return fake
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(websocket.socketio, 'emit', lambda event, data, room: events.append(data))
+    return events
+
+
+@pytest.fixture
+def aggregator(clock):
+    aggregator = ProgressAggregator(max_emits_per_second=1)
+    # 直接调用 flush，不启动后台线程
+    aggregator._redis = fakeredis.FakeRedis(decode_responses=True)
+    aggregator._save = aggregator._redis.register_script(SAVE_PROGRESS_SCRIPT)
+    aggregator._ensure_thread = lambda: None
+    return aggregator
+
+
+class TestProgressAggregator:
+    def test_merges_updates_within_interval(self, aggregator, emitted, clock):
+        aggregator.update('t1', progress=10, status='running')
+        aggregator.flush()
+        aggregator.update('t1', progress=20)
+        aggregator.update('t1', progress=30, message='page')
+        aggregator.flush()
+        assert [event['progress'] for event in emitted] == [10]
+
+        clock.now += 1
+        aggregator.flush()
+        assert emitted[-1]['progress'] == 30
+        assert emitted[-1]['message'] == 'page'
+        assert emitted[-1]['version'] == 2
+
+    def test_terminal_status_is_sent_immediately(self, aggregator, emitted):
+        aggregator.update('t1', progress=10, status='running')
+        aggregator.flush()
+        aggregator.update('t1', progress=100, status='completed')
+        aggregator.flush()
+        assert emitted[-1]['status'] == 'completed'
+        assert 't1' not in aggregator._last_emit
+
+        delta = get_progress_delta(aggregator._redis, 't1', since=1)
+        assert delta['fields'] == {'progress': 100, 'status': 'completed', 'timestamp': emitted[-1]['timestamp']}
+
+    def test_stale_emit_records_are_evicted(self, aggregator, emitted, clock):
+        aggregator.update('crashed', progress=50, status='running')
+        aggregator.flush()
+        assert 'crashed' in aggregator._last_emit
+
+        clock.now += LAST_EMIT_TTL
+        aggregator.update('active', progress=1, status='running')
+        aggregator.flush()
+        assert set(aggregator._last_emit) == {'active'}
+
+
+def test_reporter_keeps_progress_when_omitted(monkeypatch):
+    updates = []
+    monkeypatch.setattr(websocket.progress_aggregator, 'update', lambda task_id, **fields: updates.append(fields))
+    reporter = ProgressReporter('t1')
+    reporter.update(40, 'running', 'half', pages_crawled=4)
+    reporter.update(None, 'failed', 'boom')
+    assert updates == [
+        {'progress': 40, 'status': 'running', 'message': 'half', 'pages_crawled': 4},
+        {'status': 'failed', 'message': 'boom'}
+    ]
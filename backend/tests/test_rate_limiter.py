@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import fakeredis
+import pytest
+
+from crawler.rate_limiter import (
+    DomainRateLimiter, RateLimited, capped_rate, parse_retry_after, registered_domain
+)
+
+
+class TestRegisteredDomain:
+    @pytest.mark.parametrize('url, domain', [
+        ('https://www.example.com/a', 'example.com'),
+        ('https://news.bbc.co.uk/', 'bbc.co.uk'),
+        ('http://a.b.example.com.cn:8080/x', 'example.com.cn'),
+    ])
+    def test_groups_subdomains(self, url, domain):
+        assert registered_domain(url) == domain
+
+    @pytest.mark.parametrize('url, host', [
+        ('http://192.168.1.10:8000/', '192.168.1.10'),
+        ('http://localhost:5000/', 'localhost'),
+        ('http://crawler-worker/health', 'crawler-worker'),
+    ])
+    def test_keeps_ip_and_intranet_hosts(self, url, host):
+        assert registered_domain(url) == host
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after('-5') == 0
+
+    def test_http_date(self):
+        value = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=90), usegmt=True)
+        assert 85 <= parse_retry_after(value) <= 90
+
+    def test_limit_and_invalid_values(self):
+        assert parse_retry_after('999999') == 3600
+        assert parse_retry_after('999999', limit=60) == 60
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('') is None
+        assert parse_retry_after('soon') is None
+
+
+def test_rate_limited_keeps_retry_after():
+    error = RateLimited('https://example.com/', 429, 30)
+    assert (error.status, error.retry_after) == (429, 30)
+    assert '429' in str(error)
+
+
+def test_capped_rate_respects_delay():
+    assert capped_rate(4.0, 1.0) == 1.0
+    assert capped_rate(4.0, 0.1) == 4.0
+    assert capped_rate(4.0, 0) == 4.0
+
+
+class TestDomainRateLimiter:
+    def test_healthy_responses_never_exceed_max_rate(self):
+        limiter = DomainRateLimiter(
+            redis_client=fakeredis.FakeAsyncRedis(decode_responses=True),
+            rate=capped_rate(4.0, 2.0), max_rate=capped_rate(4.0, 2.0)
+        )
+
+        async def run():
+            return [await limiter.feedback('https://example.com/', latency=0.1) for _ in range(50)]
+
+        assert max(asyncio.run(run())) == 0.5
+
+    def test_throttling_halves_rate(self):
+        limiter = DomainRateLimiter(
+            redis_client=fakeredis.FakeAsyncRedis(decode_responses=True), rate=2.0, max_rate=2.0
+        )
+
+        async def run():
+            return await limiter.feedback('https://example.com/', throttled=True, retry_after=1)
+
+        assert asyncio.run(run()) == 1.0
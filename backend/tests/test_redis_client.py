@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from services.redis_client import PipelineBatcher, pipeline_batcher
+
+
+def test_concurrent_writes_share_one_round_trip(fake_async_redis):
+    redis_client = fake_async_redis
+    batcher = PipelineBatcher(redis_client, max_delay=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.execute(('set', 'a', 1), ('get', 'a')),
+            batcher.execute(('incr', 'n'),),
+            batcher.execute(('incr', 'n'), ('get', 'n')),
+        )
+
+    assert asyncio.run(run()) == [[True, '1'], [1], [2, '2']]
+    assert len(redis_client.pipelines) == 1
+
+
+def test_full_batch_is_sent_without_waiting(fake_async_redis):
+    redis_client = fake_async_redis
+    batcher = PipelineBatcher(redis_client, max_batch=2, max_delay=10)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            batcher.execute(('incr', 'n'),),
+            batcher.execute(('incr', 'n'),),
+        ), timeout=1)
+
+    assert asyncio.run(run()) == [[1], [2]]
+    assert len(redis_client.pipelines) == 1
+
+
+def test_command_error_only_fails_its_caller(fake_async_redis):
+    fake_async_redis.set('a', 1)
+    batcher = PipelineBatcher(fake_async_redis)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.execute(('hget', 'a', 'b'),),
+            batcher.execute(('set', 'a', 1),),
+            return_exceptions=True
+        )
+
+    failed, ok = asyncio.run(run())
+    assert isinstance(failed, TypeError)
+    assert ok == [True]
+
+
+def test_pipeline_failure_reaches_every_caller(fake_async_redis):
+    fake_async_redis.fail = True
+    batcher = PipelineBatcher(fake_async_redis)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.execute(('set', 'a', 1),),
+            batcher.execute(('set', 'b', 2),),
+            return_exceptions=True
+        )
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(run()))
+
+
+def test_cancelled_caller_does_not_break_the_batch(fake_async_redis):
+    batcher = PipelineBatcher(fake_async_redis, max_delay=0.01)
+
+    async def run():
+        cancelled = asyncio.create_task(batcher.execute(('set', 'a', 1),))
+        kept = asyncio.create_task(batcher.execute(('set', 'b', 2),))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await kept
+
+    assert asyncio.run(run()) == [True]
+
+
+def test_pipeline_batcher_is_shared_per_client(fake_async_redis):
+    assert pipeline_batcher(fake_async_redis) is pipeline_batcher(fake_async_redis)
+    assert pipeline_batcher(fake_async_redis) is not pipeline_batcher(type(fake_async_redis)())
@@ -0,0 +1,79 @@
+import asyncio
+
+import fakeredis
+
+from crawler.redis_frontier import RedisFrontier
+
+
+def frontier(**kwargs):
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    return RedisFrontier('job', delay=0, redis_client=redis_client, **kwargs)
+
+
+class TestRedisFrontier:
+    def test_put_deduplicates_and_get_drains(self):
+        queue = frontier()
+
+        async def run():
+            added = [await queue.put(url) for url in ('http://a.com/', 'http://A.com/#x', 'mailto:x@a.com')]
+            url, depth = await queue.get()
+            await queue.done(url)
+            return added, url, await queue.get()
+
+        assert asyncio.run(run()) == ([True, False, False], 'http://a.com/', None)
+
+    def test_requests_per_host_are_limited(self):
+        queue = frontier(host_concurrency=2)
+
+        async def run():
+            for i in range(3):
+                await queue.put(f'http://a.com/{i}')
+            leased = [await queue.get() for _ in range(2)]
+            waiting = asyncio.create_task(queue.get())
+            await asyncio.sleep(0.3)
+            blocked = not waiting.done()
+            await queue.done(leased[0][0])
+            return blocked, await waiting, await queue.redis.hgetall(queue.active_key)
+
+        blocked, third, active = asyncio.run(run())
+        assert blocked
+        assert third == ('http://a.com/2', 0)
+        assert active == {'a.com': '2'}
+
+    def test_release_and_retry_return_the_host_slot(self):
+        queue = frontier(host_concurrency=1)
+
+        async def run():
+            await queue.put('http://a.com/1')
+            url, depth = await queue.get()
+            await queue.release(url, depth)
+            url, depth = await queue.get()
+            await queue.retry(url, depth, 0.05)
+            again = await queue.get()
+            await queue.done(again[0])
+            return again, await queue.redis.hgetall(queue.active_key)
+
+        assert asyncio.run(run()) == (('http://a.com/1', 0), {})
+
+    def test_expired_lease_is_reclaimed(self):
+        queue = frontier(host_concurrency=1, lease_seconds=0.2)
+
+        async def run():
+            await queue.put('http://a.com/1')
+            first = await queue.get()
+            # 租约过期后 URL 和并发名额一起回收，其他 worker 可以重新领取
+            return first, await queue.get()
+
+        first, second = asyncio.run(run())
+        assert first == second == ('http://a.com/1', 0)
+
+    def test_clear_removes_all_keys(self):
+        queue = frontier()
+
+        async def run():
+            await queue.put('http://a.com/1')
+            await queue.get()
+            await queue.clear()
+            return await queue.redis.keys('*'), await queue.put('http://a.com/1')
+
+        assert asyncio.run(run()) == ([], True)
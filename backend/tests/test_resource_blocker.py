@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+from crawler.resource_blocker import TYPICAL_RESOURCE_BYTES, ResourceBlocker, is_tracker
+
+
+def test_is_tracker_matches_subdomains():
+    assert is_tracker('https://hm.baidu.com/hm.js')
+    assert is_tracker('https://www.google-analytics.com/analytics.js')
+    assert not is_tracker('https://notbaidu.com/hm.js')
+
+
+def test_stats_separate_measured_and_estimated_bytes():
+    blocker = ResourceBlocker(resource_types=['image'])
+    blocker._record_blocked('image')
+    blocker._record_blocked('image')
+    blocker._record_blocked('tracker')
+    blocker._on_response(SimpleNamespace(headers={'content-length': '1200'}))
+    blocker._on_response(SimpleNamespace(headers={}))
+
+    assert blocker.stats == {
+        'requests_blocked': {'image': 2, 'tracker': 1},
+        'bytes_loaded': 1200,
+        'estimated_bytes_saved': 2 * TYPICAL_RESOURCE_BYTES['image'] + TYPICAL_RESOURCE_BYTES['tracker']
+    }
@@ -0,0 +1,92 @@
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+from crawler.fetcher import check_response_status
+from crawler.rate_limiter import RateLimited
+from crawler.retry import (
+    RETRYABLE, SWITCH_PROXY, ErrorStats, HttpStatusError, RetryPolicy, classify_error
+)
+from crawler.session_store import LoginLockTimeout
+
+
+class TestClassifyError:
+    @pytest.mark.parametrize('error, error_class', [
+        (RateLimited('https://example.com/', 429, 10), 'rate_limited'),
+        (LoginLockTimeout('example.com'), 'login_wait'),
+        (HttpStatusError('https://example.com/', 502), 'http_5xx'),
+        (PlaywrightTimeoutError('Timeout 30000ms exceeded'), 'timeout'),
+        (PlaywrightError('net::ERR_NAME_NOT_RESOLVED at https://example.com/'), 'dns'),
+        (PlaywrightError('net::ERR_TUNNEL_CONNECTION_FAILED'), 'proxy'),
+        (PlaywrightError('net::ERR_CERT_AUTHORITY_INVALID'), 'tls'),
+        (PlaywrightError('net::ERR_CONNECTION_RESET'), 'connection'),
+        (PlaywrightError('Target page, context or browser has been closed'), 'browser_crashed'),
+        (PlaywrightError('Element is not attached to the DOM'), 'browser'),
+        (aiohttp.ClientConnectorError(None, socket.gaierror('Name or service not known')), 'dns'),
+        (aiohttp.ClientConnectorError(None, ConnectionRefusedError()), 'connection'),
+        (aiohttp.ServerDisconnectedError(), 'connection'),
+        (aiohttp.ClientResponseError(None, (), status=404), 'http_4xx'),
+        (asyncio.TimeoutError(), 'timeout'),
+        (ValueError('boom'), 'other'),
+    ])
+    def test_classification(self, error, error_class):
+        assert classify_error(error) == error_class
+
+    def test_login_wait_is_retried_without_switching_proxy(self):
+        assert 'login_wait' in RETRYABLE
+        assert 'login_wait' not in SWITCH_PROXY
+
+
+class TestCheckResponseStatus:
+    def test_rate_limited_statuses(self):
+        with pytest.raises(RateLimited) as info:
+            check_response_status('https://example.com/', 429, {'retry-after': '30'})
+        assert info.value.retry_after == 30
+        with pytest.raises(RateLimited):
+            check_response_status('https://example.com/', 503, {'retry-after': '5'})
+
+    def test_server_errors(self):
+        with pytest.raises(HttpStatusError):
+            check_response_status('https://example.com/', 500, {})
+
+    def test_passes_through_other_statuses(self):
+        # 不带 Retry-After 的 503 交给调用方按挑战页处理
+        for status in (200, 404, 503):
+            check_response_status('https://example.com/', status, {})
+
+
+class TestRetryPolicy:
+    def test_should_retry(self):
+        policy = RetryPolicy(max_retries=2)
+        assert policy.should_retry('timeout', 1)
+        assert policy.should_retry('timeout', 2)
+        assert not policy.should_retry('timeout', 3)
+        assert not policy.should_retry('dns', 1)
+        assert not policy.should_retry('http_4xx', 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(base_delay=2.0, max_delay=10.0)
+        for _ in range(50):
+            assert 1.0 <= policy.backoff(1) <= 2.0
+            assert 4.0 <= policy.backoff(3) <= 8.0
+            assert 5.0 <= policy.backoff(10) <= 10.0
+
+    def test_backoff_honours_retry_after(self):
+        assert RetryPolicy(base_delay=1.0).backoff(1, retry_after=30) == 30
+
+
+class TestErrorStats:
+    def test_keeps_counts_and_recent_samples(self):
+        errors = ErrorStats(sample_size=2)
+        for i in range(3):
+            errors.record(f'https://example.com/{i}', 'timeout', TimeoutError('slow'))
+        errors.record_retry('timeout')
+        assert errors.stats['total'] == 3
+        assert errors.stats['retried'] == 1
+        assert errors.stats['by_class'] == {'timeout': 3}
+        assert [sample['url'] for sample in errors.stats['samples']] == [
+            'https://example.com/1', 'https://example.com/2'
+        ]
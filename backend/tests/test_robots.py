@@ -0,0 +1,69 @@
+from crawler.robots import RobotsPolicy, RobotsRules
+
+ROBOTS_TXT = '''
+# 注释和空行会被忽略
+User-agent: *
+Disallow: /private/
+Allow: /private/public
+Disallow: /*.pdf$
+Disallow: /search?
+Crawl-delay: 2
+
+User-agent: BadBot
+User-agent: OtherBot
+Disallow: /
+
+User-agent: happyseek
+Disallow: /admin
+Crawl-delay: abc
+'''
+
+
+class TestRobotsRules:
+    def test_longest_match_wins(self):
+        rules = RobotsRules([(False, '/a'), (True, '/a/b'), (False, '/a/b/c')])
+        assert not rules.allowed('/a/x')
+        assert rules.allowed('/a/b/x')
+        assert not rules.allowed('/a/b/c/d')
+        assert rules.allowed('/other')
+
+    def test_allow_wins_on_equal_length(self):
+        assert RobotsRules([(False, '/page'), (True, '/page')]).allowed('/page')
+        assert RobotsRules([(False, '/p*e'), (True, '/p*e')]).allowed('/page')
+
+    def test_wildcards_and_end_anchor(self):
+        rules = RobotsRules([(False, '/*.pdf$'), (False, '/tmp*/cache')])
+        assert not rules.allowed('/docs/file.pdf')
+        assert rules.allowed('/docs/file.pdf?download=1')
+        assert not rules.allowed('/tmp-1/cache/x')
+
+    def test_empty_disallow_allows_everything(self):
+        assert RobotsRules([(False, '')]).allowed('/anything')
+
+
+class TestRobotsPolicy:
+    def setup_method(self):
+        self.policy = RobotsPolicy.parse(ROBOTS_TXT)
+
+    def test_default_group(self):
+        assert not self.policy.can_fetch('https://example.com/private/data', 'SomeBrowser')
+        assert self.policy.can_fetch('https://example.com/private/public/x', 'SomeBrowser')
+        assert not self.policy.can_fetch('https://example.com/report.pdf', 'SomeBrowser')
+        assert not self.policy.can_fetch('https://example.com/search?q=1', 'SomeBrowser')
+        assert self.policy.can_fetch('https://example.com/search', 'SomeBrowser')
+        assert self.policy.crawl_delay('SomeBrowser') == 2.0
+
+    def test_group_with_several_agents(self):
+        assert not self.policy.can_fetch('https://example.com/', 'Mozilla/5.0 (compatible; BadBot/1.0)')
+        assert not self.policy.can_fetch('https://example.com/', 'otherbot')
+
+    def test_own_group_replaces_default(self):
+        assert not self.policy.can_fetch('https://example.com/admin/users')
+        assert self.policy.can_fetch('https://example.com/private/data')
+        # 无法解析的 Crawl-delay 被忽略
+        assert self.policy.crawl_delay() is None
+
+    def test_missing_robots_allows_everything(self):
+        policy = RobotsPolicy.parse('')
+        assert policy.can_fetch('https://example.com/anything')
+        assert policy.crawl_delay() is None
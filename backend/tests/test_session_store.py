@@ -0,0 +1,46 @@
+import time
+
+from config import Config
+from crawler.session_store import cookie_header, open_login, seal_login
+
+LOGIN = {
+    'url': 'https://example.com/login',
+    'username': 'alice',
+    'password': 's3cret',
+    'submitSelector': '#submit'
+}
+
+
+class TestSealLogin:
+    def test_credentials_are_not_stored_in_plaintext(self):
+        sealed = seal_login(LOGIN)
+        assert set(sealed) == {'url', 'submitSelector', 'credentials'}
+        assert 'alice' not in sealed['credentials']
+        assert 's3cret' not in sealed['credentials']
+
+    def test_round_trip(self):
+        assert open_login(seal_login(LOGIN)) == LOGIN
+
+    def test_plain_and_empty_login(self):
+        assert open_login(LOGIN) == LOGIN
+        assert open_login(None) is None
+        assert open_login({}) is None
+
+    def test_undecryptable_credentials(self, monkeypatch):
+        sealed = seal_login(LOGIN)
+        monkeypatch.setattr(Config, 'SECRET_KEY', Config.SECRET_KEY + '-rotated')
+        monkeypatch.setattr(Config, 'SESSION_ENCRYPTION_KEY', None)
+        assert open_login(sealed) is None
+
+
+def test_cookie_header_filters_by_domain_path_and_expiry():
+    state = {'cookies': [
+        {'name': 'sid', 'value': '1', 'domain': '.example.com', 'path': '/'},
+        {'name': 'admin', 'value': '2', 'domain': 'example.com', 'path': '/admin'},
+        {'name': 'secure', 'value': '3', 'domain': 'example.com', 'path': '/', 'secure': True},
+        {'name': 'old', 'value': '4', 'domain': 'example.com', 'path': '/', 'expires': time.time() - 10},
+        {'name': 'other', 'value': '5', 'domain': 'other.com', 'path': '/'},
+    ]}
+    assert cookie_header(state, 'http://www.example.com/page') == 'sid=1'
+    assert cookie_header(state, 'https://example.com/admin/users') == 'sid=1; admin=2; secure=3'
+    assert cookie_header(None, 'https://example.com/') is None
@@ -0,0 +1,116 @@
+import asyncio
+import gzip
+
+from crawler.sitemap import SitemapEntry, default_sitemap_url, iter_sitemap
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*entries):
+    body = ''.join(
+        f'<url><loc>{loc}</loc>{f"<lastmod>{lastmod}</lastmod>" if lastmod else ""}</url>'
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{body}</urlset>'.encode()
+
+
+def sitemap_index(*locs):
+    body = ''.join(f'<sitemap><loc>{loc}</loc></sitemap>' for loc in locs)
+    return f'<sitemapindex {NS}>{body}</sitemapindex>'.encode()
+
+
+class FakeContent:
+    def __init__(self, body):
+        self.body = body
+
+    async def iter_chunked(self, size):
+        # 故意切成很小的块，验证跨块的增量解析
+        for start in range(0, len(self.body), 7):
+            yield self.body[start:start + 7]
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.content = FakeContent(body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, timeout=None):
+        self.requested.append(url)
+        if url not in self.pages:
+            return FakeResponse(404, b'')
+        return FakeResponse(200, self.pages[url])
+
+
+def collect(url, session, **kwargs):
+    async def run():
+        return [entry async for entry in iter_sitemap(url, session=session, **kwargs)]
+    return asyncio.run(run())
+
+
+def test_default_sitemap_url():
+    assert default_sitemap_url('https://example.com/some/page?x=1') == 'https://example.com/sitemap.xml'
+
+
+def test_parses_urlset_entries():
+    session = FakeSession({
+        'https://example.com/sitemap.xml': urlset(
+            ('https://example.com/a', '2024-01-01'),
+            ('https://example.com/b', None),
+        )
+    })
+    assert collect('https://example.com/sitemap.xml', session) == [
+        SitemapEntry('https://example.com/a', '2024-01-01'),
+        SitemapEntry('https://example.com/b', None),
+    ]
+
+
+def test_follows_index_and_gzip_children_once():
+    session = FakeSession({
+        'https://example.com/sitemap.xml': sitemap_index(
+            'https://example.com/posts.xml.gz',
+            'https://example.com/pages.xml',
+            'https://example.com/posts.xml.gz',
+        ),
+        'https://example.com/posts.xml.gz': gzip.compress(urlset(('https://example.com/p1', None))),
+        'https://example.com/pages.xml': urlset(('https://example.com/about', None)),
+    })
+    entries = collect('https://example.com/sitemap.xml', session)
+    assert sorted(entry.loc for entry in entries) == ['https://example.com/about', 'https://example.com/p1']
+    assert session.requested.count('https://example.com/posts.xml.gz') == 1
+
+
+def test_skips_missing_and_invalid_sitemaps():
+    session = FakeSession({
+        'https://example.com/sitemap.xml': sitemap_index(
+            'https://example.com/missing.xml',
+            'https://example.com/broken.xml',
+            'https://example.com/ok.xml',
+        ),
+        'https://example.com/broken.xml': b'<urlset><url><loc>oops</url>',
+        'https://example.com/ok.xml': urlset(('https://example.com/ok', None)),
+    })
+    entries = collect('https://example.com/sitemap.xml', session)
+    assert [entry.loc for entry in entries] == ['https://example.com/ok']
+
+
+def test_limits_number_of_sitemaps():
+    session = FakeSession({
+        'https://example.com/sitemap.xml': sitemap_index(
+            *(f'https://example.com/part{i}.xml' for i in range(5))
+        ),
+        **{f'https://example.com/part{i}.xml': urlset((f'https://example.com/{i}', None)) for i in range(5)},
+    })
+    entries = collect('https://example.com/sitemap.xml', session, max_sitemaps=3)
+    assert len(entries) == 2
@@ -0,0 +1,30 @@
+import base64
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from services.task_cursor import decode_cursor, encode_cursor
+
+
+class TestCursor:
+    def test_round_trip(self):
+        task = SimpleNamespace(created_at=datetime(2024, 5, 1, 12, 30, 15, 123456), id=42)
+        cursor = encode_cursor(task)
+        assert decode_cursor(cursor) == (task.created_at, 42)
+
+    def test_cursor_is_url_safe(self):
+        task = SimpleNamespace(created_at=datetime(2024, 5, 1), id=10 ** 12)
+        cursor = encode_cursor(task)
+        assert all(char.isalnum() or char in '-_=' for char in cursor)
+
+    @pytest.mark.parametrize('cursor', [
+        'not base64!',
+        base64.urlsafe_b64encode(b'not json').decode(),
+        base64.urlsafe_b64encode(b'[1]').decode(),
+        base64.urlsafe_b64encode(b'["yesterday", 1]').decode(),
+        base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+    ])
+    def test_invalid_cursor(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
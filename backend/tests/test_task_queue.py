@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from services.task_queue import CrawlQueue
+
+
+def make_queue(max_concurrent=2):
+    # 测试中不轮询 Redis 里的任务控制状态
+    return CrawlQueue(max_concurrent=max_concurrent, control_poll_interval=3600)
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+class TestCrawlQueue:
+    def test_concurrency_is_bounded(self):
+        queue = make_queue(max_concurrent=2)
+        running = []
+        peak = []
+
+        async def job(value):
+            running.append(value)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(value)
+            return value * 2
+
+        async def run():
+            return await asyncio.gather(*(queue.add_task(job, i, task_id=f't{i}') for i in range(6)))
+
+        assert asyncio.run(run()) == [0, 2, 4, 6, 8, 10]
+        assert max(peak) == 2
+
+    def test_exception_propagates_and_frees_slot(self):
+        queue = make_queue(max_concurrent=1)
+
+        async def fail():
+            raise ValueError('boom')
+
+        async def ok():
+            return 'ok'
+
+        async def run():
+            with pytest.raises(ValueError, match='boom'):
+                await queue.add_task(fail, task_id='bad')
+            return await queue.add_task(ok, task_id='good')
+
+        assert asyncio.run(run()) == 'ok'
+
+    def test_cancel_pending_and_running(self):
+        queue = make_queue(max_concurrent=1)
+        started = []
+
+        async def job(name):
+            started.append(name)
+            await asyncio.Event().wait()
+
+        async def run():
+            running = await queue.submit(job, 'a', task_id='a')
+            pending = await queue.submit(job, 'b', task_id='b')
+            await settle()
+            assert await queue.cancel('b')
+            assert await queue.cancel('a')
+            await settle()
+            assert not await queue.cancel('missing')
+            return running.cancelled(), pending.cancelled(), queue.active_tasks, queue.pending_count
+
+        assert asyncio.run(run()) == (True, True, set(), 0)
+        assert started == ['a']
+
+    def test_pause_and_resume_pending_task(self):
+        queue = make_queue(max_concurrent=1)
+        order = []
+
+        async def run():
+            release = asyncio.Event()
+
+            async def blocker():
+                await release.wait()
+                order.append('blocker')
+
+            async def job(name):
+                order.append(name)
+
+            first = await queue.submit(blocker, task_id='blocker')
+            paused = await queue.submit(job, 'paused', task_id='paused')
+            other = await queue.submit(job, 'other', task_id='other')
+            await settle()
+            assert await queue.pause('paused')
+            release.set()
+            await first
+            await other
+            await settle()
+            assert not paused.done()
+
+            assert await queue.resume('paused')
+            await paused
+
+        asyncio.run(run())
+        assert order == ['blocker', 'other', 'paused']
+
+    def test_pause_running_task_requeues_it(self):
+        queue = make_queue(max_concurrent=1)
+        attempts = []
+
+        async def run():
+            release = asyncio.Event()
+
+            async def job():
+                attempts.append(1)
+                await release.wait()
+                return len(attempts)
+
+            future = await queue.submit(job, task_id='t')
+            await settle()
+            assert await queue.pause('t')
+            await settle()
+            assert queue.pending_count == 1 and not future.done()
+
+            release.set()
+            assert await queue.resume('t')
+            return await future
+
+        assert asyncio.run(run()) == 2
+
+    def test_user_with_fewest_running_tasks_goes_first(self):
+        queue = make_queue(max_concurrent=2)
+        order = []
+
+        async def run():
+            release = asyncio.Event()
+
+            async def job(name):
+                order.append(name)
+                await release.wait()
+
+            futures = [await queue.submit(job, 'a1', task_id='a1', user_id='a')]
+            await settle()
+            futures += [
+                await queue.submit(job, name, task_id=name, user_id=user, priority=priority)
+                for name, user, priority in (('a2', 'a', 5), ('b1', 'b', 1))
+            ]
+            await settle()
+            release.set()
+            await asyncio.gather(*futures)
+
+        asyncio.run(run())
+        assert order == ['a1', 'b1', 'a2']
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from services.task_stats import (
+    DAILY_KEY, STATUS_KEY, get_task_stats, record_status_change, record_task_created,
+    replace_task_stats
+)
+
+
+def today(offset=0):
+    return (datetime.utcnow() - timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def test_created_tasks_are_counted_by_status_and_day(fake_redis):
+    redis_client = fake_redis
+    record_task_created(redis_client, 1)
+    record_task_created(redis_client, 1, count=3)
+    record_task_created(redis_client, 1, created_at=datetime.utcnow() - timedelta(days=2))
+
+    total, trend = get_task_stats(redis_client, 1)
+    assert total == {'pending': 5}
+    assert trend == {today(): 4, today(2): 1}
+    # 每次写入和读取都只有一次往返
+    assert len(redis_client.pipelines) == 4
+
+
+def test_status_changes_move_counts(fake_redis):
+    redis_client = fake_redis
+    record_task_created(redis_client, 1, count=2)
+    record_status_change(redis_client, 1, 'pending', 'running')
+    record_status_change(redis_client, 1, 'running', 'running')
+    record_status_change(redis_client, 1, 'running', 'completed')
+
+    total, _ = get_task_stats(redis_client, 1)
+    # 计数为 0 的状态不返回
+    assert total == {'pending': 1, 'completed': 1}
+
+
+def test_stats_are_kept_per_user_and_window(fake_redis):
+    redis_client = fake_redis
+    record_task_created(redis_client, 1, created_at=datetime.utcnow() - timedelta(days=10))
+    record_task_created(redis_client, 2)
+
+    total, trend = get_task_stats(redis_client, 1, days=7)
+    assert total == {'pending': 1}
+    assert trend == {}
+    assert get_task_stats(redis_client, 1, days=10)[1] == {today(10): 1}
+    assert get_task_stats(redis_client, 3) == ({}, {})
+
+
+def test_replace_rebuilds_rollups_and_drops_old_days(fake_redis):
+    redis_client = fake_redis
+    record_task_created(redis_client, 1, count=5)
+    replace_task_stats(redis_client, 1, {'completed': 2, 'failed': 1}, {today(1): 3, today(400): 9})
+
+    assert redis_client.data[STATUS_KEY.format(1)] == {'completed': '2', 'failed': '1'}
+    assert redis_client.data[DAILY_KEY.format(1)] == {today(1): '3'}
+
+    replace_task_stats(redis_client, 1, {}, {})
+    assert get_task_stats(redis_client, 1) == ({}, {})
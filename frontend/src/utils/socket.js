@@ -18,6 +18,8 @@ export function setupTaskSocket() {
                 window.location.origin.replace('http', 'ws') + '/ws'
   
   socket = io(wsUrl, {
+    // 服务端在连接时校验 JWT，只允许订阅自己的任务
+    auth: { token: appStore.token },
     reconnectionAttempts: RECONNECT_LIMIT,
     timeout: 10000,
     transports: ['websocket'],